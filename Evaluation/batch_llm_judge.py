@@ -1,64 +1,111 @@
+"""Judge every raw CSV in data/raw_csv/ in one process.
+
+    python batch_llm_judge.py --concurrency 32 --rpm 2000
+
+All files are judged concurrently by one LLMJudge, so they share its rate
+limiter, HTTP client and answer cache, and each file resumes from its earlier
+results like llm_as_judge.py. It only asks for confirmation on an interactive
+terminal, and never with --yes, so it can run from cron or batch jobs.
+"""
+
 import os
-import glob
-import subprocess
 import sys
-from pathlib import Path
+import glob
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    JUDGE_CACHE_MAX_BYTES,
+    JUDGE_CACHE_PATH,
+    JUDGE_CONCURRENCY,
+    JUDGE_REQUESTS_PER_MINUTE,
+    JUDGE_TOKENS_PER_MINUTE,
+    RAW_CSV_DIR,
+    RESULTS_CSV_DIR
+)
+from llm_as_judge import (
+    JUDGE_MODES,
+    LLMJudge,
+    judge_csv,
+    print_cache_stats,
+    print_summary,
+    results_path
+)
+from common.response_cache import ResponseCache
 
 def get_csv_files(raw_csv_dir):
     """Get all CSV files from the raw_csv directory."""
     csv_pattern = os.path.join(raw_csv_dir, "*.csv")
     csv_files = glob.glob(csv_pattern)
-    return [os.path.basename(f) for f in csv_files]
+    return sorted(os.path.basename(f) for f in csv_files)
 
-def run_llm_judge(csv_filename):
-    """Run the LLM judge script for a single CSV file."""
-    print(f"\n{'='*60}")
-    print(f"Processing: {csv_filename}")
-    print(f"{'='*60}")
-    
-    try:
-        # Get the absolute path to the llm_as_judge.py script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        llm_judge_script = os.path.join(script_dir, "llm_as_judge.py")
-        
-        # Run the llm_as_judge.py script
-        result = subprocess.run([
-            sys.executable, 
-            llm_judge_script, 
-            "--input_csv", 
-            csv_filename
-        ], capture_output=True, text=True, cwd=os.getcwd())
-        
-        if result.returncode == 0:
-            print(f"✅ Successfully processed: {csv_filename}")
-            print(result.stdout)
-        else:
-            print(f"❌ Error processing: {csv_filename}")
-            print(f"Error: {result.stderr}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Exception while processing {csv_filename}: {e}")
-        return False
-    
-    return True
+class BatchProgress:
+    """Per-file row counters, updated by the judge threads and printed periodically."""
+
+    def __init__(self, csv_files):
+        self.lock = threading.Lock()
+        self.files = {name: {"finished": 0, "total": 0, "judged": 0, "start": None, "end": None}
+                      for name in csv_files}
+
+    def start(self, name):
+        with self.lock:
+            self.files[name]["start"] = time.perf_counter()
+
+    def finish(self, name):
+        with self.lock:
+            self.files[name]["end"] = time.perf_counter()
+
+    def callback(self, name):
+        """A judge_rows progress callback for one file."""
+        def update(idx, finished, total, judged):
+            with self.lock:
+                self.files[name].update(finished=finished, total=total, judged=judged)
+        return update
+
+    def line(self, elapsed):
+        with self.lock:
+            parts = [f"{name.replace('_results_evaluation_table', '').replace('.csv', '')}: {f['finished']}/{f['total']}"
+                     for name, f in self.files.items() if f["start"] is not None]
+            finished = sum(f["finished"] for f in self.files.values())
+        return f"⏳ [{elapsed:6.0f}s] {finished / max(elapsed, 1e-9):.2f} rows/sec | " + " | ".join(parts)
+
+    def report(self, stop, every):
+        """Print a progress line every `every` seconds until `stop` is set."""
+        start = time.perf_counter()
+        while not stop.wait(every):
+            print(self.line(time.perf_counter() - start), flush=True)
 
 def main():
     """Main function to process all CSV files."""
-    # Get the raw_csv directory path
-    raw_csv_dir = "data/raw_csv"
-    
+    parser = argparse.ArgumentParser(description="Judge all raw CSV files concurrently in one process.")
+    parser.add_argument('--files', nargs='+', help='Raw CSV files in data/raw_csv/ to judge (default: all)')
+    parser.add_argument('--mode', choices=JUDGE_MODES, default='separate', help='Judge mode (see llm_as_judge.py)')
+    parser.add_argument('--concurrency', type=int, default=JUDGE_CONCURRENCY,
+                        help=f'Rows judged in parallel across all files (default: {JUDGE_CONCURRENCY})')
+    parser.add_argument('--rpm', type=int, default=JUDGE_REQUESTS_PER_MINUTE,
+                        help=f'Requests per minute limit for the whole batch, 0 = unlimited (default: {JUDGE_REQUESTS_PER_MINUTE})')
+    parser.add_argument('--tpm', type=int, default=JUDGE_TOKENS_PER_MINUTE,
+                        help=f'Prompt tokens per minute limit for the whole batch, 0 = unlimited (default: {JUDGE_TOKENS_PER_MINUTE})')
+    parser.add_argument('--retry-failed', action='store_true', help='Only re-judge cells whose earlier call failed')
+    parser.add_argument('--no-fast-path', action='store_true', help='Judge rows whose equation matches the reference too')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the API instead of reusing cached answers')
+    parser.add_argument('--fresh', action='store_true', help='Discard existing results instead of resuming from them')
+    parser.add_argument('--progress-every', type=float, default=10, help='Seconds between progress lines (default: 10)')
+    parser.add_argument('--yes', '-y', action='store_true', help='Do not ask for confirmation (implied without a terminal)')
+    args = parser.parse_args()
+
     # Check if directory exists
-    if not os.path.exists(raw_csv_dir):
-        print(f"❌ Directory '{raw_csv_dir}' does not exist!")
+    if not os.path.exists(RAW_CSV_DIR):
+        print(f"❌ Directory '{RAW_CSV_DIR}' does not exist!")
         print("Please create the directory and place your CSV files there.")
         return
     
     # Get all CSV files
-    csv_files = get_csv_files(raw_csv_dir)
+    csv_files = args.files or get_csv_files(RAW_CSV_DIR)
     
     if not csv_files:
-        print(f"❌ No CSV files found in '{raw_csv_dir}'!")
+        print(f"❌ No CSV files found in '{RAW_CSV_DIR}'!")
         print("Please place your CSV files in the data/raw_csv/ directory.")
         return
     
@@ -67,34 +114,70 @@ def main():
         print(f"  {i}. {file}")
     
     # Ask for confirmation
-    response = input(f"\nDo you want to process all {len(csv_files)} files? (y/n): ").lower().strip()
-    if response not in ['y', 'yes']:
-        print("❌ Cancelled by user.")
-        return
+    if not args.yes and sys.stdin.isatty():
+        response = input(f"\nDo you want to process all {len(csv_files)} files? (y/n): ").lower().strip()
+        if response not in ['y', 'yes']:
+            print("❌ Cancelled by user.")
+            return
     
-    # Process each file
-    successful = 0
-    failed = 0
+    # One judge for the whole batch: a single rate limiter, connection pool and cache
+    cache = None if args.no_cache else ResponseCache(JUDGE_CACHE_PATH, JUDGE_CACHE_MAX_BYTES)
+    judge = LLMJudge(requests_per_minute=args.rpm, tokens_per_minute=args.tpm, cache=cache)
+    # Split the row concurrency between files; the limiter caps the total rate anyway
+    per_file = max(1, args.concurrency // len(csv_files))
+    progress = BatchProgress(csv_files)
+
+    def run(csv_file):
+        progress.start(csv_file)
+        try:
+            return judge_csv(judge, csv_file, mode=args.mode, concurrency=per_file, retry_failed=args.retry_failed,
+                             fresh=args.fresh, fast_path=not args.no_fast_path, progress=progress.callback(csv_file))
+        finally:
+            progress.finish(csv_file)
+
+    stop = threading.Event()
+    reporter = threading.Thread(target=progress.report, args=(stop, args.progress_every), daemon=True)
+    reporter.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(csv_files)) as pool:
+        futures = {csv_file: pool.submit(run, csv_file) for csv_file in csv_files}
+        outcomes = {}
+        for csv_file, future in futures.items():
+            try:
+                outcomes[csv_file] = future.result()
+            except Exception as e:
+                print(f"❌ Error processing {csv_file}: {e}")
+                outcomes[csv_file] = None
+    stop.set()
+    wall = time.perf_counter() - start
     
-    for i, csv_file in enumerate(csv_files, 1):
-        print(f"\n🔄 Processing file {i}/{len(csv_files)}: {csv_file}")
-        
-        if run_llm_judge(csv_file):
-            successful += 1
-        else:
-            failed += 1
+    # Per-file summaries, printed once every file is done so they do not interleave
+    for csv_file, results in outcomes.items():
+        if results:
+            print(f"\n{'='*60}")
+            print(f"✅ {csv_file} -> {results_path(csv_file, args.mode)}")
+            print_summary(results)
     
     # Summary
     print(f"\n{'='*60}")
     print("📊 BATCH PROCESSING SUMMARY")
     print(f"{'='*60}")
+    for csv_file in csv_files:
+        f = progress.files[csv_file]
+        seconds = (f["end"] or time.perf_counter()) - (f["start"] or start)
+        status = "✅" if outcomes[csv_file] is not None else "❌"
+        print(f"{status} {csv_file}: {f['finished']} rows ({f['judged']} scores) judged in {seconds:.1f}s "
+              f"-> {f['finished'] / max(seconds, 1e-9):.2f} rows/sec")
+    successful = sum(results is not None for results in outcomes.values())
+    total_rows = sum(f["finished"] for f in progress.files.values())
     print(f"✅ Successfully processed: {successful} files")
-    print(f"❌ Failed to process: {failed} files")
-    print(f"📁 Total files: {len(csv_files)}")
+    print(f"❌ Failed to process: {len(csv_files) - successful} files")
+    print(f"📁 Total files: {len(csv_files)} | {total_rows} rows in {wall:.1f}s -> {total_rows / wall:.2f} rows/sec")
+    if cache:
+        print_cache_stats(cache)
     
     if successful > 0:
-        print(f"\n📂 Results saved in: data/result_csv/")
-        print("Files will have '_llm_judge_results.csv' suffix.")
+        print(f"\n📂 Results saved in: {RESULTS_CSV_DIR}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
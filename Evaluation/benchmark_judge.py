@@ -0,0 +1,65 @@
+"""Offline throughput benchmark: run the LLM judge loop against common/mock_server.py.
+
+    python benchmark_judge.py --input_csv gpt-4o-mini_results_evaluation_table.csv --rows 100 --latency lognormal:0.5,0.5
+
+Reports judged rows/sec, API calls/sec and the time spent saving the results
+CSV, without calling the OpenAI API. Results go to a temporary file.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+import llm_as_judge
+from config import JUDGE_CONCURRENCY, RAW_CSV_DIR
+from llm_as_judge import JUDGE_MODES, LLMJudge, judge_rows
+from common.mock_server import MockLLMServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LLM judge loop against a local mock API server.")
+    parser.add_argument('--input_csv', type=str, default="gpt-4o-mini_results_evaluation_table.csv",
+                        help='Raw CSV file in data/raw_csv/ to judge')
+    parser.add_argument('--rows', type=int, default=50, help='Number of rows to judge (default: 50)')
+    parser.add_argument('--latency', default="lognormal:0.5,0.5",
+                        help='Mock response latency: fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Fraction of mock requests rejected with 429')
+    parser.add_argument('--mode', choices=JUDGE_MODES, default='separate', help='Judge mode to benchmark')
+    parser.add_argument('--concurrency', type=int, default=JUDGE_CONCURRENCY,
+                        help=f'Rows judged in parallel (default: {JUDGE_CONCURRENCY})')
+    parser.add_argument('--save-every', type=int, default=20, help='Checkpoint interval in rows (default: 20)')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(RAW_CSV_DIR, args.input_csv)).head(args.rows)
+    results_csv_path = os.path.join(tempfile.mkdtemp(prefix="judge_benchmark_"), "results.csv")
+
+    # Time every checkpoint write made by judge_rows
+    checkpoint = {"seconds": 0.0, "calls": 0}
+    save_results = llm_as_judge.save_results
+
+    def timed_save(results, path):
+        start = time.perf_counter()
+        save_results(results, path)
+        checkpoint["seconds"] += time.perf_counter() - start
+        checkpoint["calls"] += 1
+
+    llm_as_judge.save_results = timed_save
+
+    with MockLLMServer(latency=args.latency, rate_limit=args.rate_limit) as server:
+        judge = LLMJudge(api_key="mock", base_url=f"{server.url}/v1")
+        start = time.perf_counter()
+        results = judge_rows(judge, df, results_csv_path, args.save_every, mode=args.mode,
+                             concurrency=args.concurrency)
+        timed_save(results, results_csv_path)
+        wall = time.perf_counter() - start
+
+    print(f"\n⏱️  Benchmark: {len(results)} rows in {wall:.2f}s -> {len(results) / wall:.2f} rows/sec, "
+          f"{server.requests / wall:.2f} API calls/sec")
+    print(f"💾 Checkpointing: {checkpoint['seconds']:.3f}s over {checkpoint['calls']} CSV saves "
+          f"= {checkpoint['seconds'] / wall * 100:.1f}% of wall time")
+    print(f"🧪 Mock server: {server.requests} requests, {server.rate_limited} rate-limited | results in {results_csv_path}")
+
+
+if __name__ == "__main__":
+    main()
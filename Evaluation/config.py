@@ -136,4 +136,89 @@ Respond **only** in the following format (and nothing else):
 
 Score: <1-5>  
 Explanation: <brief justification>
-"""
\ No newline at end of file
+"""
+# All five dimensions in one call: the inputs appear once and the rubrics are the
+# ones above, verbatim. Used by `llm_as_judge.py --mode combined`.
+COMBINED_RUBRIC_PROMPT = """
+You are evaluating a generated equation and variable description on FIVE dimensions, compared to the reference and promblem context provided below.
+
+**Context**:{context}
+**Ground Truth Equation (multi equations separated by `||`)**: {eq_gt}
+**Generated Equation (multi equations separated by `||`)**: {eq_gen}
+**Ground Truth Description**:{description_gt}
+**Generated Description**: {description_gen}
+
+Score each dimension independently. SYNTACTIC CORRECTNESS looks at the generated equation only; INFORMATIONAL COMPLETENESS and CONTEXUAL APPROPRIATENESS judge the generated equation and description against the context only, not against the ground truth.
+
+### 1. semantic: SEMANTIC ACCURACY
+Measures whether the generated equation expresses the same mathematical relationships as the ground truth equation, allowing for equivalent rearrangements or variable renaming.
+	- **5**: Exact same meaning; only trivial variations allowed (e.g., algebraic rearrangement, variable renaming).
+	- **4**: Near-match; small semantic deviations but intent clearly preserved.
+	- **3**: Core meaning largely correct but includes some secondary inaccuracies (e.g., incorrect constant or minor relation misinterpreted).
+	- **2**: Partial overlap in meaning; significant misunderstanding or contradiction.
+	- **1**: Completely unrelated; wrong understanding of task.
+
+### 2. reasoning: REASONING QUALITY
+Evaluates the logical clarity and correctness of the relationships implied or inferred by the generated equations and descriptions, as explicit reasoning steps are not available. 
+You should mentally infer the reasoning process the model may have followed and evaluate its logical clarity.
+- **5**: Clearly inferred logical relationships between variables and operations. Implied reasoning path fully logical and consistent.
+- **4**: Generally logical inferred relationships; minor ambiguity or small logical gaps not significantly impacting clarity.
+- **3**: Partially clear logic; noticeable gaps or ambiguity in inferred reasoning.
+- **2**: Significant logical inconsistencies or confusion in inferred reasoning; inferred logic barely understandable.
+- **1**: No coherent inferred logic; relationships confusing or nonsensical.
+
+### 3. completeness: INFORMATIONAL COMPLETENESS
+Evaluates if the generated equations and descriptions provide a complete final solution that fully answers or resolves the problem scenario, considering intermediate steps are not explicitly generated or required.
+- **5**: All necessary terms, variables, and constraints are present in the equation/block. No signs of under-specification.
+- **4**: Minor omissions, e.g., one term or constraint missing, but the equation is still practically usable.
+- **3**: Noticeable omissions of key components, but the overall structure is still interpretable as partially solving the problem.
+- **2**: Several important components missing or ambiguous.
+- **1**: Equation feels incomplete or disconnected from any meaningful solution.
+
+### 4. syntactic: SYNTACTIC CORRECTNESS
+Measures whether the equation is mathematically well-formed and syntactically valid (e.g., parsable LaTeX, balanced structure), independent of correctness of meaning.
+- **5**: Fully valid; no syntax, parsing, or formatting issues.
+- **4**: Minor syntax issues (e.g., a bracket or LaTeX detail) but easily correctable.
+- **3**: Noticeable formatting issues but still parseable and interpretable.
+- **2**: Multiple syntax errors that hinder rendering or understanding.
+- **1**: Completely ill-formed; not parseable or interpretable.
+
+### 5. contextual: CONTEXUAL APPROPRIATENESS
+Assesses whether the generated equation and description appropriately match the scenario, intent, or constraints of the original problem statement and reflect the specific scenario or problem context provided.
+- **5**: Perfectly matches and clearly addresses the described context.
+- **4**: Strong alignment with minor ambiguity or weakly integrated detail.
+- **3**: Partial relevance; some generic or incorrectly inferred parts.
+- **2**: Loosely related; insufficient follow-through on context.
+- **1**: Completely irrelevant or hallucinated content.
+
+**IMPORTANT**  
+Respond **only** with a JSON object in the following format (and nothing else):
+
+{{"semantic": {{"score": <1-5>, "explanation": "<brief justification>"}}, "reasoning": {{"score": <1-5>, "explanation": "<brief justification>"}}, "completeness": {{"score": <1-5>, "explanation": "<brief justification>"}}, "syntactic": {{"score": <1-5>, "explanation": "<brief justification>"}}, "contextual": {{"score": <1-5>, "explanation": "<brief justification>"}}}}
+"""
+
+# Judge throughput: parallel requests, and requests/min and tokens/min limits (0 = unlimited)
+JUDGE_CONCURRENCY = 8
+JUDGE_REQUESTS_PER_MINUTE = 500
+JUDGE_TOKENS_PER_MINUTE = 200000
+
+# Judge answers cached across models and reruns, keyed by (judge model, temperature, prompt)
+JUDGE_CACHE_PATH = "data/judge_cache.sqlite"
+JUDGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Replaces the "Score/Explanation" format instructions of the dimension prompts in
+# `llm_as_judge.py --mode logprob`, which reads the score from one token's logprobs
+LOGPROB_INSTRUCTION = """**IMPORTANT**
+Respond with the score only: a single digit from 1 to 5, and nothing else.
+"""
+# Alternatives returned for the score token (the API allows up to 20)
+LOGPROB_TOP_N = 10
+
+# Merged GPT-2 token/positional embedding tables for TexBLEU, built by embedding_table.py
+# and memory-mapped when present (otherwise GPT-2 is loaded into memory)
+EMBEDDING_TABLE_PATH = "data/gpt2_embedding_table"
+
+# GPT-2 tokenizations and token embeddings shared by TexBLEU and ROUGE-L (in-memory LRU),
+# and the file where metrics_evaluation.py keeps token ids between runs
+TOKEN_CACHE_MAX_BYTES = 512 * 1024 * 1024
+TOKEN_CACHE_PATH = "data/token_cache.json"
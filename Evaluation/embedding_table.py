@@ -0,0 +1,121 @@
+"""Merged GPT-2 embedding tables for TexBLEU, stored once on disk and memory-mapped.
+
+    python embedding_table.py --dtype float16 --normalize
+
+Writes the token table (GPT-2 `wte` with the rows of new_embeddings.pth
+appended) and the positional table (`wpe` x 100, as used by TexBLEU) to
+EMBEDDING_TABLE_PATH. When that directory exists, utils.load_GPT2_models()
+maps it read-only instead of loading GPT-2, so every worker process shares
+one physical copy through the page cache and a lookup only reads the rows of
+the tokens it needs.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import torch
+
+DTYPES = ("float32", "float16", "int8")
+POSITION_SCALE = 100
+
+
+def source_stamp(path):
+    """Size and mtime of a source file, to tell when a table is out of date."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+class EmbeddingTable:
+    """Read-only, memory-mapped token and positional embedding tables.
+
+    float16 and int8 tables are expanded to float32 on lookup; int8 rows are
+    quantized symmetrically with one float32 scale per row. A `normalized`
+    table holds unit-length token vectors, which leaves cosine similarity
+    unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.tokens = np.load(os.path.join(path, "tokens.npy"), mmap_mode='r')
+        self.positions = np.load(os.path.join(path, "positions.npy"), mmap_mode='r')
+        self.scales = np.load(os.path.join(path, "scales.npy"), mmap_mode='r') if self.meta["dtype"] == "int8" else None
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    def is_stale(self, new_embeddings_path):
+        return self.meta["new_embeddings"] != source_stamp(new_embeddings_path)
+
+    def lookup(self, token_ids, device="cpu"):
+        """Float32 token embeddings of a token id sequence, as an (n_tokens, dim) tensor."""
+        ids = np.asarray(token_ids, dtype=np.int64)
+        token_embeddings = self.tokens[ids].astype(np.float32)
+        if self.scales is not None:
+            token_embeddings *= self.scales[ids][:, None]
+        return torch.from_numpy(token_embeddings).to(device)
+
+    def position_tensor(self, device="cpu"):
+        """The whole (small) positional table as a float32 tensor."""
+        return torch.from_numpy(np.array(self.positions, dtype=np.float32)).to(device)
+
+
+def build_table(path, token_weight, position_weight, dtype="float32", normalize=False, new_embeddings_path=None):
+    """Write the tables to `path` (replacing an existing table only once the new one is complete)."""
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype '{dtype}'; use one of {', '.join(DTYPES)}")
+    tokens = token_weight.detach().float().cpu().numpy()
+    if normalize:
+        tokens = tokens / np.maximum(np.linalg.norm(tokens, axis=1, keepdims=True), 1e-12)
+
+    tmp_path = path.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    if dtype == "int8":
+        scales = (np.maximum(np.abs(tokens).max(axis=1), 1e-12) / 127).astype(np.float32)
+        np.save(os.path.join(tmp_path, "scales.npy"), scales)
+        tokens = np.round(tokens / scales[:, None]).astype(np.int8)
+    else:
+        tokens = tokens.astype(dtype)
+    np.save(os.path.join(tmp_path, "tokens.npy"), tokens)
+    # Same float32 product as `wpe(positions) * 100` at lookup time
+    positions = position_weight.detach().float().cpu() * POSITION_SCALE
+    np.save(os.path.join(tmp_path, "positions.npy"), positions.numpy())
+
+    meta = {"dtype": dtype, "normalized": normalize, "vocab_size": tokens.shape[0], "dim": tokens.shape[1],
+            "positions": positions.shape[0], "position_scale": POSITION_SCALE,
+            "new_embeddings": source_stamp(new_embeddings_path) if new_embeddings_path else None}
+    with open(os.path.join(tmp_path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return meta
+
+
+def main():
+    from config import EMBEDDING_TABLE_PATH
+    from utils import NEW_EMBEDDINGS_PATH, load_gpt2_weights
+
+    parser = argparse.ArgumentParser(description="Build the memory-mapped GPT-2 embedding tables used by TexBLEU")
+    parser.add_argument('--output', default=EMBEDDING_TABLE_PATH, help=f'Table directory (default: {EMBEDDING_TABLE_PATH})')
+    parser.add_argument('--dtype', choices=DTYPES, default="float32",
+                        help='Token table precision; float32 reproduces the in-memory scores exactly (default: float32)')
+    parser.add_argument('--normalize', action='store_true', help='Store unit-length token vectors (cosine only)')
+    args = parser.parse_args()
+
+    token_weight, position_weight = load_gpt2_weights()
+    meta = build_table(args.output, token_weight, position_weight, args.dtype, args.normalize, NEW_EMBEDDINGS_PATH)
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    print(f"Embedding table written to {args.output}: {meta['vocab_size']} tokens x {meta['dim']} ({meta['dtype']}"
+          f"{', normalized' if meta['normalized'] else ''}), {size / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
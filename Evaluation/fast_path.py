@@ -0,0 +1,17 @@
+"""Pre-pass that spots generated equations matching the ground truth, so metrics and judge calls can skip them."""
+
+from utils import clean_latex
+
+def match_kind(reference, prediction):
+    """How the generated equation matches the reference: "exact" or None.
+    
+    Only strings identical after clean_latex count. Comparing SymPy parses is
+    not safe: parse_latex silently stops at syntax it does not support, so
+    unrelated equations (e.g. `F^{*}=F_{\\theta}(D_{src},D_{tgt})\\approx...`
+    and `F^{*}=F_{\\theta}(F_{init},C^{l})`) both parse to just `F`.
+    """
+    reference = clean_latex(reference)
+    prediction = clean_latex(prediction)
+    if reference and reference == prediction:
+        return "exact"
+    return None
@@ -1,4 +1,5 @@
 import os
+import sys
 import glob
 import json
 import csv
@@ -9,26 +10,14 @@ outputs_dir = os.path.join(base_dir, 'Generation', 'outputs')
 raw_csv_dir = os.path.join(base_dir, 'Evaluation', 'data/raw_csv')
 dataset_path = os.path.join(base_dir, 'Dataset', 'academic_dataset_Final.json')
 
+sys.path.insert(0, base_dir)
+from common.dataset_index import DatasetIndex
+
 # Ensure raw_csv directory exists
 os.makedirs(raw_csv_dir, exist_ok=True)
 
-# Load the academic dataset (ground truth)
-with open(dataset_path, "r", encoding="utf-8") as f:
-    academic_data = json.load(f)
-
-# Create a dictionary to easily look up papers and equations in academic dataset
-academic_dict = {}
-for paper in academic_data:
-    paper_id = paper.get("id", "")
-    academic_dict[paper_id] = {}
-    equations = paper.get("equations", [])
-    for eq in equations:
-        eq_id = eq.get("equation id", "")
-        academic_dict[paper_id][eq_id] = {
-            "ground_truth_eq": " || ".join(eq.get("EQ_latex", [])),
-            "ground_truth_description": eq.get("description", ""),
-            "context": eq.get("context", "")
-        }
+# Open the academic dataset (ground truth); equations are looked up by (paper_id, equation_id)
+academic_index = DatasetIndex(dataset_path)
 
 # Process each output JSON file in outputs_dir
 json_files = glob.glob(os.path.join(outputs_dir, '*_results.json'))
@@ -41,13 +30,14 @@ for json_file in json_files:
     for paper_id, paper_data in output_data.items():
         for eq_id, output_content in paper_data.items():
             # Skip if this paper_id or equation_id doesn't exist in the academic dataset
-            if paper_id not in academic_dict or eq_id not in academic_dict[paper_id]:
+            entry = academic_index.get(paper_id, eq_id)
+            if entry is None:
                 continue
 
             # Get ground truth data
-            ground_truth_eq = academic_dict[paper_id][eq_id]["ground_truth_eq"]
-            ground_truth_desc = academic_dict[paper_id][eq_id]["ground_truth_description"]
-            context = academic_dict[paper_id][eq_id]["context"]
+            ground_truth_eq = " || ".join(entry["EQ_latex"])
+            ground_truth_desc = entry["description"]
+            context = entry["context"]
 
             # Extract generated equation and description from output data
             generated_eq = ""
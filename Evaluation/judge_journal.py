@@ -0,0 +1,64 @@
+"""Append-only checkpoint journal for LLM-judge scores."""
+
+import json
+import os
+
+
+class ScoreJournal:
+    """JSONL log with one record per judged row, holding the dimensions scored in that call.
+
+    Records are flushed as soon as they are written and fsynced every
+    `fsync_every` records. A torn final line from an interrupted write is
+    dropped when the journal is reopened. Scores are keyed by
+    (paper_id, equation_id) as strings, so they match keys read back from CSV.
+    """
+
+    def __init__(self, path, fsync_every=20):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.unsynced = 0
+        self._drop_torn_tail()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _drop_torn_tail(self):
+        """Cut a partial last line left by a crash, so new records start on a fresh line."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def append(self, paper_id, equation_id, scores):
+        """Record {dimension: score} for one row; a None score marks a failed call."""
+        record = {"paper_id": str(paper_id), "equation_id": str(equation_id), "scores": scores}
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def replay(self, cells):
+        """Merge every journaled record into `cells` ({(paper_id, equation_id): {dimension: score}})."""
+        count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                cells.setdefault((record["paper_id"], record["equation_id"]), {}).update(record["scores"])
+                count += 1
+        return count
+
+    def truncate(self):
+        """Empty the journal once its records are safely in the results CSV."""
+        self.file.truncate(0)
+        self.file.seek(0)
+        self.sync()
+
+    def close(self):
+        self.sync()
+        self.file.close()
@@ -1,9 +1,21 @@
 import os
+import sys
+import json
+import hashlib
+import math
 import pandas as pd
-from openai import OpenAI
 import re
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from config import (
+    COMBINED_RUBRIC_PROMPT,
+    JUDGE_CACHE_MAX_BYTES,
+    JUDGE_CACHE_PATH,
+    JUDGE_CONCURRENCY,
+    JUDGE_REQUESTS_PER_MINUTE,
+    JUDGE_TOKENS_PER_MINUTE,
+    LOGPROB_INSTRUCTION,
+    LOGPROB_TOP_N,
     SEMANTIC_ACCURACY_PROMPT,
     REASONING_PROMPT,
     COMPLETENESS_PROMPT,
@@ -13,20 +25,64 @@ from config import (
     RESULTS_CSV_DIR
 )
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.client_registry import get_client
+from common.rate_limiter import RateLimiter, estimate_tokens
+from common.response_cache import ResponseCache
+from fast_path import match_kind
+from judge_journal import ScoreJournal
+
+DIMENSIONS = ['semantic', 'reasoning', 'completeness', 'syntactic', 'contextual']
+# separate: one call per dimension; combined: one JSON call per row, per-dimension fallback;
+# logprob: one call per dimension answered with a single score token, scored from its logprobs
+JUDGE_MODES = ("separate", "combined", "logprob")
+SCORES = range(1, 6)
+# Dimensions judged on the equation alone: a generated equation matching the reference
+# (see fast_path.py) gets these without a call. The others also weigh descriptions and context.
+FAST_PATH_SCORES = {'semantic': 5, 'syntactic': 5}
+# Read ids as text so keys from the input and results CSVs always match
+ID_DTYPES = {'paper_id': str, 'equation_id': str}
+
+SYSTEM_PROMPT = "You are a mathematical evaluation assistant. Respond only with the score and a one-sentence explanation in this format: 'Score: X' followed by 'Explanation: [your explanation]'"
+COMBINED_SYSTEM_PROMPT = "You are a mathematical evaluation assistant. Respond only with a JSON object giving, for each dimension, a score and a one-sentence explanation."
+LOGPROB_SYSTEM_PROMPT = "You are a mathematical evaluation assistant. Respond only with the score, a single digit from 1 to 5."
+
 
 class LLMJudge:
-    def __init__(self, model_name="gpt-4.1-mini", api_key=None, temperature=0.2):
+    def __init__(self, model_name="gpt-4.1-mini", api_key=None, temperature=0.2, base_url=None,
+                 requests_per_minute=None, tokens_per_minute=None, cache=None):
         self.model_name = model_name
         self.temperature = temperature
-        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+        # Optional ResponseCache; judge answers are stored as JSON (raw response plus parsed scores)
+        self.cache = cache
+        # Shared by every thread calling this judge
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        # base_url=None uses the OpenAI API (or $OPENAI_BASE_URL, e.g. common/mock_server.py).
+        # The client comes from the shared registry, so judges reuse one connection pool.
+        self.client = get_client("openai", api_key or os.getenv("OPENAI_API_KEY"), base_url)
 
+    def cache_key(self, system, prompt):
+        """Hash of everything that determines a judge answer: model, temperature and prompts."""
+        payload = json.dumps([self.model_name, self.temperature, system, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def cached(self, key):
+        entry = self.cache.get(key) if self.cache else None
+        return json.loads(entry) if entry is not None else None
+    
     def evaluate(self, prompt):
         """Evaluate using standard chat completion"""
+        key = self.cache_key(SYSTEM_PROMPT, prompt)
+        entry = self.cached(key)
+        if entry is not None:
+            return entry["score"], entry["explanation"]
+        
+        self.rate_limiter.acquire(estimate_tokens(prompt))
         try:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=[
-                    {"role": "system", "content": "You are a mathematical evaluation assistant. Respond only with the score and a one-sentence explanation in this format: 'Score: X' followed by 'Explanation: [your explanation]'"},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=self.temperature,
@@ -34,11 +90,127 @@ class LLMJudge:
             )
             
             content = response.choices[0].message.content
-            return self.parse_response(content)
+            score, explanation = self.parse_response(content)
             
         except Exception as e:
             print(f"Error in evaluation: {e}")
             return None, f"Error occurred: {str(e)}"
+        
+        # Unparseable answers are not cached, so a retry gets a fresh one
+        if self.cache and score is not None:
+            self.cache.put(key, json.dumps({"response": content, "score": score, "explanation": explanation}))
+        return score, explanation
+    
+    def evaluate_combined(self, prompt):
+        """Score every dimension in one JSON response; returns {dimension: (score, explanation)}"""
+        key = self.cache_key(COMBINED_SYSTEM_PROMPT, prompt)
+        entry = self.cached(key)
+        if entry is not None:
+            return {dimension: tuple(value) for dimension, value in entry["scores"].items()}
+        
+        self.rate_limiter.acquire(estimate_tokens(prompt))
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": COMBINED_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=self.temperature,
+                max_tokens=1024,
+                response_format={"type": "json_object"}
+            )
+            content = response.choices[0].message.content
+            scores = self.parse_combined_response(content)
+            
+        except Exception as e:
+            print(f"Error in combined evaluation: {e}")
+            return {}
+        
+        # Only complete answers are cached; partial ones are re-asked next time
+        if self.cache and len(scores) == len(DIMENSIONS):
+            self.cache.put(key, json.dumps({"response": content, "scores": scores}))
+        return scores
+    
+    def evaluate_logprob(self, prompt):
+        """Score from the top logprobs of a one-token answer; returns (argmax score, expected score)"""
+        key = self.cache_key(LOGPROB_SYSTEM_PROMPT, prompt)
+        entry = self.cached(key)
+        if entry is not None:
+            return entry["score"], entry["expected"]
+        
+        self.rate_limiter.acquire(estimate_tokens(prompt))
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": LOGPROB_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=self.temperature,
+                max_tokens=1,
+                logprobs=True,
+                top_logprobs=LOGPROB_TOP_N
+            )
+            top = [(t.token, t.logprob) for t in response.choices[0].logprobs.content[0].top_logprobs]
+            score, expected = self.parse_logprobs(top)
+            
+        except Exception as e:
+            print(f"Error in logprob evaluation: {e}")
+            return None, None
+        
+        if self.cache and score is not None:
+            self.cache.put(key, json.dumps({"top_logprobs": top, "score": score, "expected": expected}))
+        return score, expected
+    
+    def parse_logprobs(self, top_logprobs):
+        """Argmax and probability-weighted mean over the 1-5 tokens among [(token, logprob)]
+        
+        Probabilities are renormalized over the valid scores; (None, None) if none is present.
+        """
+        probs = {}
+        for token, logprob in top_logprobs:
+            token = token.strip()
+            if token.isdigit() and int(token) in SCORES:
+                # " 4" and "4" are different tokens with the same meaning
+                probs[int(token)] = probs.get(int(token), 0.0) + math.exp(logprob)
+        total = sum(probs.values())
+        if not total:
+            return None, None
+        score = max(probs, key=probs.get)
+        expected = sum(s * p for s, p in probs.items()) / total
+        return score, round(expected, 4)
+    
+    def parse_combined_response(self, response):
+        """Parse a combined-rubric JSON response; dimensions without a valid 1-5 score are left out"""
+        try:
+            data = json.loads(response)
+        except json.JSONDecodeError:
+            # Tolerate prose or code fences around the object
+            match = re.search(r"\{.*\}", response, re.DOTALL)
+            if not match:
+                return {}
+            try:
+                data = json.loads(match.group(0))
+            except json.JSONDecodeError:
+                return {}
+        if not isinstance(data, dict):
+            return {}
+        
+        scores = {}
+        for dimension in DIMENSIONS:
+            entry = data.get(dimension)
+            if isinstance(entry, dict):
+                score, explanation = entry.get("score"), entry.get("explanation", "")
+            else:
+                score, explanation = entry, ""
+            try:
+                score = int(score)
+            except (TypeError, ValueError):
+                continue
+            if 1 <= score <= 5:
+                scores[dimension] = (score, str(explanation).strip())
+        return scores
     
     def parse_response(self, response):
         """Parse the LLM response to extract score and explanation"""
@@ -74,109 +246,413 @@ class LLMJudge:
         
         return score, explanation
 
-def main():
-    parser = argparse.ArgumentParser(description="LLM as Judge: Evaluate a specific raw CSV file.")
-    parser.add_argument('--input_csv', type=str, required=True, help='Name of the raw CSV file in data/raw_csv/')
-    args = parser.parse_args()
-
-    input_csv_filename = args.input_csv
-    input_csv_path = os.path.join(RAW_CSV_DIR, input_csv_filename)
-    results_csv_filename = input_csv_filename.replace('.csv', '_llm_judge_results.csv')
-    results_csv_path = os.path.join(RESULTS_CSV_DIR, results_csv_filename)
-    # Ensure output directory exists
-    os.makedirs(RESULTS_CSV_DIR, exist_ok=True)
-
-
-    # Initialize the LLM judge
-    judge = LLMJudge()
-    
-    # Load data
-    df = pd.read_csv(input_csv_path)
-    results = []
-    save_every = 20  # Save every 5 results
-
-    
-    for idx, row in df.iterrows():
-        print(f"\nProcessing entry {idx+1}...")
-        
-        # Prepare prompts for each evaluation dimension
-        semantic_prompt = SEMANTIC_ACCURACY_PROMPT.format(
+def build_prompts(row):
+    """Prompt for each evaluation dimension of one table row."""
+    return {
+        "semantic": SEMANTIC_ACCURACY_PROMPT.format(
             context=row['context'],
             eq_gt=row['ground_truth_eq'],
             eq_gen=row['generated_equation'],
             description_gt=row['ground_truth_description'],
             description_gen=row['generated_description']
-        )
-        
-        reasoning_prompt = REASONING_PROMPT.format(
+        ),
+        "reasoning": REASONING_PROMPT.format(
             context=row['context'],
             eq_gt=row['ground_truth_eq'],
             eq_gen=row['generated_equation'],
             description_gt=row['ground_truth_description'],
             description_gen=row['generated_description']
-        )
-        
-        completeness_prompt = COMPLETENESS_PROMPT.format(
+        ),
+        "completeness": COMPLETENESS_PROMPT.format(
             context=row['context'],
             eq_gen=row['generated_equation'],
             description_gen=row['generated_description']
-        )
-
-        syntactic_prompt = SYNTACTIC_CORRECTNESS_PROMPT.format(
+        ),
+        "syntactic": SYNTACTIC_CORRECTNESS_PROMPT.format(
             eq_gen=row['generated_equation']
-        )
-
-        contextual_prompt = CONTEXUAL_APPROPRIATENESS_PROMPT.format(
+        ),
+        "contextual": CONTEXUAL_APPROPRIATENESS_PROMPT.format(
             context=row['context'],
             eq_gen=row['generated_equation'],
             description_gen=row['generated_description']
-        )
-
-        # Evaluate each dimension
-        semantic_score, semantic_explanation = judge.evaluate(semantic_prompt)
-        reasoning_score, reasoning_explanation = judge.evaluate(reasoning_prompt)
-        completeness_score, completeness_explanation = judge.evaluate(completeness_prompt)
-        syntactic_score, syntactic_explanation = judge.evaluate(syntactic_prompt)
-        contextual_score, contextual_explanation = judge.evaluate(contextual_prompt)
-
-        # Compile results
-        result = {
-            "paper_id": row['paper_id'],
-            "equation_id": row['equation_id'],
-            "semantic_score": semantic_score,
-            # "semantic_explanation": semantic_explanation,
-            "reasoning_score": reasoning_score,
-            # "reasoning_explanation": reasoning_explanation,
-            "completeness_score": completeness_score,
-            # "completeness_explanation": completeness_explanation,
-            "syntactic_score": syntactic_score,
-            # "syntactic_explanation": syntactic_explanation,
-            "contextual_score": contextual_score,
-            # "contextual_explanation": contextual_explanation
-        }
+        ),
+    }
+
+
+def build_combined_prompt(row):
+    """Single prompt asking for all five dimension scores of one table row as JSON."""
+    return COMBINED_RUBRIC_PROMPT.format(
+        context=row['context'],
+        eq_gt=row['ground_truth_eq'],
+        eq_gen=row['generated_equation'],
+        description_gt=row['ground_truth_description'],
+        description_gen=row['generated_description']
+    )
+
+
+def logprob_prompt(prompt):
+    """A dimension prompt with its Score/Explanation format replaced by LOGPROB_INSTRUCTION."""
+    rubric, _, _ = prompt.rpartition("**IMPORTANT**")
+    return rubric + LOGPROB_INSTRUCTION
+
+
+def judge_row(judge, row, mode="separate", dimensions=DIMENSIONS):
+    """Scores of one row as {dimension: score}, plus how many fell back to their own prompt.
+    
+    Only `dimensions` are judged. In combined mode any dimension missing from
+    the JSON answer (or the whole answer, if the call failed) is scored with its
+    single-dimension prompt; a single dimension always gets its own prompt.
+    In logprob mode the expected score is added as "<dimension>_expected".
+    """
+    combined = {}
+    if mode == "combined" and len(dimensions) > 1:
+        combined = judge.evaluate_combined(build_combined_prompt(row))
+    prompts = build_prompts(row)
+    scores = {}
+    fallbacks = 0
+    for dimension in dimensions:
+        if mode == "logprob":
+            scores[dimension], scores[f"{dimension}_expected"] = judge.evaluate_logprob(logprob_prompt(prompts[dimension]))
+        elif dimension in combined:
+            scores[dimension] = combined[dimension][0]
+        else:
+            if mode == "combined" and len(dimensions) > 1:
+                fallbacks += 1
+            scores[dimension], explanation = judge.evaluate(prompts[dimension])
+    return scores, fallbacks
+
+
+def is_missing(score):
+    return score is None or (isinstance(score, float) and math.isnan(score))
+
+
+def agreement_report(results, reference):
+    """Print per-dimension agreement of `results` with `reference` (e.g. combined vs five-call scores).
+    
+    Rows are matched on (paper_id, equation_id); cells without a score on
+    either side are skipped.
+    """
+    reference = {(str(r['paper_id']), str(r['equation_id'])): r for r in reference}
+    print("\nAgreement with five-call scores:")
+    for dimension in DIMENSIONS:
+        column = f"{dimension}_score"
+        pairs = []
+        for r in results:
+            other = reference.get((str(r['paper_id']), str(r['equation_id'])))
+            if other is None or is_missing(r.get(column)) or is_missing(other.get(column)):
+                continue
+            pairs.append((float(r[column]), float(other[column])))
+        if not pairs:
+            print(f"  {dimension:13} no overlapping scores")
+            continue
+        n = len(pairs)
+        exact = sum(a == b for a, b in pairs) / n
+        within_one = sum(abs(a - b) <= 1 for a, b in pairs) / n
+        mean_diff = sum(abs(a - b) for a, b in pairs) / n
+        print(f"  {dimension:13} n={n:<5} exact {exact:6.1%} | within 1 {within_one:6.1%} | mean |diff| {mean_diff:.2f} | "
+              f"mean {sum(a for a, _ in pairs) / n:.2f} vs {sum(b for _, b in pairs) / n:.2f}")
+
+
+def row_key(paper_id, equation_id):
+    return (str(paper_id), str(equation_id))
+
+
+def save_results(results, results_csv_path):
+    """Write results atomically, so a crash mid-write never loses the previous checkpoint."""
+    tmp_path = results_csv_path + ".tmp"
+    pd.DataFrame(results).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, results_csv_path)
+
+
+def load_previous(results_csv_path):
+    """Rows of an existing results CSV, {(paper_id, equation_id): {column: value}}, every column in file order.
+    
+    Columns the judge does not write (e.g. explanations from older runs) are
+    kept, so checkpoints write them back for rows that are not re-judged.
+    """
+    if not os.path.exists(results_csv_path):
+        return {}
+    previous = pd.read_csv(results_csv_path, dtype=ID_DTYPES)
+    return {row_key(r['paper_id'], r['equation_id']): {column: None if is_missing(value) else value
+                                                         for column, value in r.items()}
+            for r in previous.to_dict('records')}
+
+
+def load_scores(previous, journal=None):
+    """Scores judged so far, {(paper_id, equation_id): {dimension: score}}.
+    
+    Takes the rows of an existing results CSV (see load_previous) and replays
+    the journal over them. Failed cells come back as None, so they can be told
+    apart from unjudged ones.
+    """
+    cells = {}
+    for key, r in previous.items():
+        scores = cells[key] = {}
+        for dimension in DIMENSIONS:
+            for column, name in ((f"{dimension}_score", dimension), (f"{dimension}_expected", f"{dimension}_expected")):
+                if column in r:
+                    scores[name] = r[column]
+    if journal is not None:
+        replayed = journal.replay(cells)
+        if replayed:
+            print(f"Replayed {replayed} journaled rows from {journal.path}")
+    return cells
+
+
+def pending_dimensions(scores, retry_failed=False):
+    """Dimensions of a row still to judge: unjudged and failed ones, or only failed ones with `retry_failed`."""
+    if retry_failed:
+        return [d for d in DIMENSIONS if d in scores and is_missing(scores[d])]
+    return [d for d in DIMENSIONS if is_missing(scores.get(d))]
+
+
+def apply_fast_path(df, cells, mode="separate"):
+    """Fill FAST_PATH_SCORES (and in logprob mode their expected scores) for rows whose generated equation matches the reference.
+    
+    Only rows where none of those dimensions has been judged yet are filled,
+    so scores from earlier judge calls are never relabelled. Returns
+    {(paper_id, equation_id): "exact"} for the rows filled now.
+    """
+    fast_paths = {}
+    for paper_id, equation_id, reference, prediction in zip(
+            df['paper_id'], df['equation_id'], df['ground_truth_eq'], df['generated_equation']):
+        key = row_key(paper_id, equation_id)
+        scores = cells.get(key, {})
+        if not all(is_missing(scores.get(dimension)) for dimension in FAST_PATH_SCORES):
+            continue
+        kind = match_kind(reference, prediction)
+        if not kind:
+            continue
+        fast_paths[key] = kind
+        scores = cells.setdefault(key, {})
+        for dimension, score in FAST_PATH_SCORES.items():
+            scores[dimension] = score
+            if mode == "logprob":
+                scores[f"{dimension}_expected"] = float(score)
+    return fast_paths
+
+
+def ordered_results(df, cells, fast_paths=None, mode="separate", previous=None):
+    """One result dict per judged row of `df`, in dataset order (logprob mode adds expected scores).
+    
+    Rows of an existing results CSV (`previous`, see load_previous) keep all
+    their columns; only the scores are taken from `cells`.
+    """
+    fast_paths = fast_paths or {}
+    previous = previous or {}
+    template = dict.fromkeys(next(iter(previous.values()), {}))
+    results = []
+    for paper_id, equation_id in zip(df['paper_id'], df['equation_id']):
+        key = row_key(paper_id, equation_id)
+        scores = cells.get(key)
+        if scores is None:
+            continue
+        result = {**template, **previous.get(key, {}), "paper_id": paper_id, "equation_id": equation_id}
+        for dimension in DIMENSIONS:
+            result[f"{dimension}_score"] = scores.get(dimension)
+        if mode == "logprob":
+            for dimension in DIMENSIONS:
+                result[f"{dimension}_expected"] = scores.get(f"{dimension}_expected")
+        result["fast_path"] = fast_paths.get(key) or result.get("fast_path") or ""
         results.append(result)
-        # Save every 5 results
-        if len(results) % save_every == 0:
-            results_df = pd.DataFrame(results)
-            results_df.to_csv(results_csv_path, index=False)
-            print(f"Saved {len(results)} results to {results_csv_path}")
-    # # Save results
-    if results and (len(results) % save_every != 0):
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(results_csv_path, index=False)
-        print(f"\nResults saved to {results_csv_path}")
-        
-        # Print summary statistics
-        print("\nSummary Statistics:")
-        for dimension in ['semantic', 'reasoning', 'completeness', 'syntactic', 'contextual']:
-            scores = [r[f'{dimension}_score'] for r in results if r[f'{dimension}_score'] is not None]
-            if scores:
-                avg_score = sum(scores) / len(scores)
-                print(f"Average {dimension} score: {avg_score:.2f}")
-            else:
-                print(f"No valid {dimension} scores")
+    return results
+
+
+def judge_rows(judge, df, results_csv_path, save_every=20, mode="separate", concurrency=1,
+               cells=None, journal=None, retry_failed=False, fast_path=True, progress=None, previous=None):
+    """Score the pending cells of every row, up to `concurrency` rows in flight.
+    
+    `cells` holds scores from earlier runs (see load_scores); rows whose
+    dimensions are all scored are skipped, and with `fast_path` unjudged rows
+    matching the reference equation get FAST_PATH_SCORES first. Each finished
+    row is appended to `journal`, and every `save_every` rows the results CSV
+    is rewritten in dataset order (keeping the other columns of `previous`
+    rows) and the journal emptied. The CSV is left alone when no cell changed.
+    Returns all results in dataset order.
+    
+    `progress(idx, finished, total, judged)` is called after each row; by
+    default a line is printed instead.
+    """
+    name = os.path.basename(results_csv_path)
+    cells = {} if cells is None else cells
+    previous = {} if previous is None else previous
+    # Journaled rows not yet in the CSV also need a checkpoint
+    unsaved = journal is not None and os.path.getsize(journal.path) > 0
+    fast_paths = apply_fast_path(df, cells, mode) if fast_path else {}
+    if fast_paths:
+        print(f"Fast path ({name}): {len(fast_paths)} rows match the reference equation exactly; "
+              f"{' and '.join(FAST_PATH_SCORES)} scored without calls")
+    todo = []
+    for position, (idx, row) in enumerate(df.iterrows()):
+        dimensions = pending_dimensions(cells.get(row_key(row['paper_id'], row['equation_id']), {}), retry_failed)
+        if dimensions:
+            todo.append((idx, row, dimensions))
+    total = len(todo)
+    if total < len(df):
+        print(f"Resuming {name}: {len(df) - total} rows already judged, "
+              f"{sum(len(d) for _, _, d in todo)} cells in {total} rows to go")
+    
+    def checkpoint():
+        save_results(ordered_results(df, cells, fast_paths, mode, previous), results_csv_path)
+        if journal is not None:
+            journal.truncate()
+    
+    rows = iter(todo)
+    finished = 0
+    judged = 0
+    fallbacks = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+        while True:
+            # Keep the pool busy without queueing every row up front
+            for idx, row, dimensions in rows:
+                in_flight[pool.submit(judge_row, judge, row, mode, dimensions)] = (idx, row, dimensions)
+                if len(in_flight) >= concurrency * 2:
+                    break
+            if not in_flight:
+                break
+            
+            try:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            except KeyboardInterrupt:
+                for future in in_flight:
+                    future.cancel()
+                raise
+            for future in done:
+                idx, row, dimensions = in_flight.pop(future)
+                scores, row_fallbacks = future.result()
+                key = row_key(row['paper_id'], row['equation_id'])
+                cells.setdefault(key, {}).update(scores)
+                for dimension in dimensions:
+                    # An explanation from an older run no longer matches the new score
+                    if f"{dimension}_explanation" in previous.get(key, {}):
+                        previous[key][f"{dimension}_explanation"] = None
+                if journal is not None:
+                    journal.append(row['paper_id'], row['equation_id'], scores)
+                finished += 1
+                judged += len(dimensions)
+                fallbacks += row_fallbacks
+                if progress:
+                    progress(idx, finished, total, judged)
+                else:
+                    print(f"Processed entry {idx+1} ({finished}/{total})")
+                if finished % save_every == 0:
+                    checkpoint()
+                    print(f"Saved {finished} results to {results_csv_path}")
+    
+    if finished or fast_paths or unsaved:
+        checkpoint()
+    results = ordered_results(df, cells, fast_paths, mode, previous)
+    if mode == "combined":
+        print(f"\nCombined mode: {fallbacks} of {judged} scores fell back to single-dimension prompts")
+    return results
+
+
+def results_path(input_csv_filename, mode="separate"):
+    """Results CSV for a raw CSV; combined and logprob scores get their own files so they can be compared with the five-call ones."""
+    suffix = '_llm_judge_results.csv' if mode == "separate" else f'_llm_judge_{mode}_results.csv'
+    return os.path.join(RESULTS_CSV_DIR, input_csv_filename.replace('.csv', suffix))
+
+
+def judge_csv(judge, input_csv_filename, mode="separate", concurrency=1, retry_failed=False, fresh=False,
+              fast_path=True, save_every=20, progress=None):
+    """Judge one raw CSV from data/raw_csv/ into its results CSV, resuming from earlier runs.
+    
+    Returns the results in dataset order (see judge_rows).
+    """
+    results_csv_path = results_path(input_csv_filename, mode)
+    journal_path = results_csv_path.replace('.csv', '_journal.jsonl')
+    os.makedirs(RESULTS_CSV_DIR, exist_ok=True)
+    if fresh:
+        for path in (results_csv_path, journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    df = pd.read_csv(os.path.join(RAW_CSV_DIR, input_csv_filename), dtype=ID_DTYPES)
+    journal = ScoreJournal(journal_path)
+    previous = load_previous(results_csv_path)
+    cells = load_scores(previous, journal)
+    try:
+        return judge_rows(judge, df, results_csv_path, save_every, mode=mode, concurrency=concurrency,
+                          cells=cells, journal=journal, retry_failed=retry_failed, fast_path=fast_path,
+                          progress=progress, previous=previous)
+    finally:
+        journal.close()
+
+
+def print_summary(results):
+    """Average score per dimension, and how many cells still lack a score."""
+    print("\nSummary Statistics:")
+    for dimension in DIMENSIONS:
+        scores = [r[f'{dimension}_score'] for r in results if not is_missing(r[f'{dimension}_score'])]
+        if scores:
+            avg_score = sum(scores) / len(scores)
+            print(f"Average {dimension} score: {avg_score:.2f}")
+        else:
+            print(f"No valid {dimension} scores")
+        expected = [r[f'{dimension}_expected'] for r in results if not is_missing(r.get(f'{dimension}_expected'))]
+        if expected:
+            print(f"Average {dimension} expected score: {sum(expected) / len(expected):.2f}")
+    failed = sum(is_missing(r[f'{dimension}_score']) for r in results for dimension in DIMENSIONS)
+    if failed:
+        print(f"{failed} scores missing; rerun to judge them (--retry-failed retries only failed calls)")
+
+
+def print_cache_stats(cache):
+    lookups = cache.hits + cache.misses
+    if lookups:
+        print(f"\nJudge cache: {cache.hits}/{lookups} answers reused this run ({cache.hits / lookups:.1%})")
+    cache.print_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM as Judge: Evaluate a specific raw CSV file.")
+    parser.add_argument('--input_csv', type=str, required=True, help='Name of the raw CSV file in data/raw_csv/')
+    parser.add_argument('--mode', choices=JUDGE_MODES, default='separate',
+                        help='separate: one call per dimension; combined: all five scores in one JSON call; logprob: one-token answers '
+                             'scored from their logprobs (argmax and expected score). Non-separate modes write *_llm_judge_<mode>_results.csv')
+    parser.add_argument('--concurrency', type=int, default=JUDGE_CONCURRENCY,
+                        help=f'Rows judged in parallel (default: {JUDGE_CONCURRENCY})')
+    parser.add_argument('--rpm', type=int, default=JUDGE_REQUESTS_PER_MINUTE,
+                        help=f'Requests per minute limit, 0 = unlimited (default: {JUDGE_REQUESTS_PER_MINUTE})')
+    parser.add_argument('--tpm', type=int, default=JUDGE_TOKENS_PER_MINUTE,
+                        help=f'Prompt tokens per minute limit, 0 = unlimited (default: {JUDGE_TOKENS_PER_MINUTE})')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Only re-judge cells whose earlier call failed (no score), leaving unjudged rows alone')
+    parser.add_argument('--no-fast-path', action='store_true',
+                        help='Send every row to the judge, even when the generated equation matches the reference')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Always call the API instead of reusing cached judge answers from {JUDGE_CACHE_PATH}')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Discard existing results and journal instead of resuming from them')
+    parser.add_argument('--agreement', action='store_true',
+                        help='Only compare existing results of --mode (combined if not given) with the five-call ones, without calling the API')
+    args = parser.parse_args()
+
+    separate_csv_path = results_path(args.input_csv)
+    if args.agreement:
+        mode = "combined" if args.mode == "separate" else args.mode
+        agreement_report(pd.read_csv(results_path(args.input_csv, mode), dtype=ID_DTYPES).to_dict('records'),
+                         pd.read_csv(separate_csv_path, dtype=ID_DTYPES).to_dict('records'))
+        return
+
+    # Initialize the LLM judge
+    cache = None if args.no_cache else ResponseCache(JUDGE_CACHE_PATH, JUDGE_CACHE_MAX_BYTES)
+    judge = LLMJudge(requests_per_minute=args.rpm, tokens_per_minute=args.tpm, cache=cache)
+    
+    results = judge_csv(judge, args.input_csv, mode=args.mode, concurrency=args.concurrency,
+                        retry_failed=args.retry_failed, fresh=args.fresh, fast_path=not args.no_fast_path)
+    if results:
+        print(f"\nResults saved to {results_path(args.input_csv, args.mode)}")
+        print_summary(results)
     else:
         print("No results to save.")
+    
+    if cache:
+        print_cache_stats(cache)
+    
+    if args.mode != "separate" and results and os.path.exists(separate_csv_path):
+        agreement_report(results, pd.read_csv(separate_csv_path, dtype=ID_DTYPES).to_dict('records'))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,6 @@
 
 
+from functools import lru_cache
 from sympy.parsing.latex import parse_latex
 from sympy import Basic
 from zss import Node, simple_distance
@@ -12,18 +13,23 @@ def sympy_to_zss(expr):
     children = [sympy_to_zss(arg) for arg in expr.args]
     return Node(label, children)
 
+# The same reference equations are parsed for every model CSV evaluated in one run, so parses are cached
+@lru_cache(maxsize=4096)
+def parse_equation(latex):
+    return parse_latex(latex)
+
 def tree_edit_distance_zss(latex1, latex2):
     try:
-        expr1 = parse_latex(latex1)
-        expr2 = parse_latex(latex2)
+        expr1 = parse_equation(latex1)
+        expr2 = parse_equation(latex2)
         tree1 = sympy_to_zss(expr1)
         tree2 = sympy_to_zss(expr2)
     except Exception as e:
         print(f"Parse error: {e}")
         return 1.0, {'parse_error': True}
 
-    # zss.simple_distance returns the unnormalized edit distance
-    dist = simple_distance(tree1, tree2)
+    # zss.simple_distance returns the unnormalized edit distance; identical equations that parse are 0 apart
+    dist = 0 if latex1 == latex2 else simple_distance(tree1, tree2)
     max_size = max(len(list(tree1.iter())), len(list(tree2.iter())))
     norm_dist = dist / max_size if max_size > 0 else 0.0
     return norm_dist, {
@@ -1,12 +1,22 @@
 import argparse
 import os
-from config import RAW_CSV_DIR, PROCESSED_CSV_DIR, RESULTS_CSV_DIR
+from config import RAW_CSV_DIR, PROCESSED_CSV_DIR, RESULTS_CSV_DIR, TOKEN_CACHE_PATH
 from preprocessing import load_and_preprocess_data
-from static_metrics import texbleu, cal_levenshtein_distance, ratio, rouge_l_tokenized
+from static_metrics import texbleu_batch, cal_levenshtein_distance, ratio, rouge_l_tokenized
 import pandas as pd
-from math_metrics import avg_tree_edit_distance  
+from math_metrics import avg_tree_edit_distance
+from fast_path import match_kind
+from utils import token_cache, get_gpt2_token_tensors
 
-def evaluation_pipeline(input_csv_filename):
+# TexBLEU of a prediction identical to the reference (see fast_path.py): every token distance is 0,
+# so each n-gram precision is 1. An equation with fewer tokens than the largest n-gram order (2 in
+# texbleu_batch) has no window of that order and scores near 0, so those rows are still computed.
+# The other metrics are always computed; tree edit distance skips the tree comparison for
+# identical equations itself
+FAST_PATH_TEXBLEU = 1.0
+FAST_PATH_MIN_TOKENS = 2
+
+def evaluation_pipeline(input_csv_filename, fast_path=True):
     # Paths
     raw_csv_path = os.path.join(RAW_CSV_DIR, input_csv_filename)
     cleaned_csv_filename = input_csv_filename.replace('.csv', '_cleaned.csv')
@@ -23,10 +33,12 @@ def evaluation_pipeline(input_csv_filename):
     print(f"\nTotal number of rows after cleaning: {len(df)}")
     
     results = []
+    fast_paths = 0
+    # (idx, reference, prediction, result, fast path kind, TexBLEU known) of every scored row
+    rows = []
 
     # Process all rows
     for idx, row in df.iterrows():
-        print(f"Processing entry {idx + 1}/{len(df)}...")
         reference = row['ground_truth_eq']
         prediction = row['generated_equation']
 
@@ -35,28 +47,45 @@ def evaluation_pipeline(input_csv_filename):
             print(f"  Skipping entry {idx + 1} due to empty prediction.")
             continue
 
-        texbleu_score, _, _ = texbleu(reference, prediction)
+        # Fast path: exact matches skip TexBLEU
+        kind = match_kind(reference, prediction) if fast_path else None
+        fast_paths += bool(kind)
+        known = bool(kind) and len(get_gpt2_token_tensors(reference)[2]) >= FAST_PATH_MIN_TOKENS
+        result = {
+            'paper_id': row.get('paper_id'),
+            'equation_id': row.get('equation_id'),
+        }
+        results.append(result)
+        rows.append((idx, reference, prediction, result, kind, known))
+
+    pending = [(reference, prediction) for _, reference, prediction, _, _, known in rows if not known]
+    print(f"Computing TexBLEU for {len(pending)} rows...")
+    texbleu_scores = iter(texbleu_batch([reference for reference, _ in pending],
+                                        [prediction for _, prediction in pending]))
+
+    for idx, reference, prediction, result, kind, known in rows:
+        print(f"Processing entry {idx + 1}/{len(df)}...")
         lev_score = cal_levenshtein_distance(reference, prediction)
         seq_score  = ratio(reference, prediction)
         rouge_score = rouge_l_tokenized(reference, prediction)
+        texbleu_score = FAST_PATH_TEXBLEU if known else next(texbleu_scores)
         avg_ted, ted_scores = avg_tree_edit_distance(reference, prediction)
 
-        result = {
-            'paper_id': row.get('paper_id'),
-            'equation_id': row.get('equation_id'),
+        result.update({
             'texbleu': texbleu_score,
             'levenshtein_distance': lev_score,
             'sequence_similarity': seq_score,
             'rouge_l': rouge_score,
             'avg_tree_edit_distance': avg_ted,
-            'individual_ted_scores': str(ted_scores)
-        }
-        results.append(result)
+            'individual_ted_scores': str(ted_scores),
+            'fast_path': kind or ''
+        })
 
     if results:
         results_df = pd.DataFrame(results)
         results_df.to_csv(metrics_csv_path, index=False)
         print(f"\nMetrics results saved to {metrics_csv_path}")
+        print(f"{fast_paths} of {len(results)} rows matched the reference exactly and skipped TexBLEU (fast_path column)")
 
         # Print summary statistics
         print("\nSummary Statistics:")
@@ -66,7 +95,19 @@ def evaluation_pipeline(input_csv_filename):
         print("No results to save.")
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Run evaluation on a specific raw CSV file.")
-    parser.add_argument('--input_csv', type=str, required=True, help='Name of the raw CSV file in data/raw_csv/')
+    parser = argparse.ArgumentParser(description="Run evaluation on one or more raw CSV files.")
+    parser.add_argument('--input_csv', type=str, nargs='+', required=True,
+                        help='Name(s) of raw CSV files in data/raw_csv/; files evaluated together share the token cache')
+    parser.add_argument('--no-fast-path', action='store_true',
+                        help='Run TexBLEU on rows identical to the reference too')
+    parser.add_argument('--no-token-cache', action='store_true',
+                        help=f'Do not read or update the token ids saved in {TOKEN_CACHE_PATH}')
     args = parser.parse_args()
-    evaluation_pipeline(args.input_csv)
\ No newline at end of file
+
+    if not args.no_token_cache:
+        print(f"Loaded token ids of {token_cache.load(TOKEN_CACHE_PATH)} strings from {TOKEN_CACHE_PATH}")
+    for input_csv in args.input_csv:
+        evaluation_pipeline(input_csv, fast_path=not args.no_fast_path)
+        token_cache.print_stats()
+    if not args.no_token_cache:
+        token_cache.save(TOKEN_CACHE_PATH)
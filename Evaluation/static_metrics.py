@@ -1,7 +1,7 @@
 import torch
 import math
 import difflib
-from utils import get_gpt2_token_embeddings, load_GPT2_models
+from utils import get_gpt2_token_tensors, load_GPT2_models
 from difflib import SequenceMatcher
 from Levenshtein import distance as levenshtein_distance
 from rouge_score import rouge_scorer
@@ -26,74 +26,92 @@ def cal_levenshtein_distance(reference, prediction):
 
 
 ## TexBLEU
-def cosine_distance(emb1, emb2):
-    return 1 - torch.cosine_similarity(emb1.unsqueeze(0), emb2.unsqueeze(0)).item()
-
-def token_distance(token1, token2, w_emb=0.5, w_pos=0.5, alpha=2, beta=0.1):
-    emb1, pos1 = token1
-    emb2, pos2 = token2
-    
-    emb_dist = cosine_distance(emb1, emb2) ** alpha
-
-    pos_dist = math.tanh(beta * torch.abs(pos1 - pos2).float().mean().item())
-    
-    distance = w_emb * emb_dist + w_pos * pos_dist
-    
-    return distance
-
-def n_gram_similarity(ref_tokens, pred_tokens, n, max_d=2.0):
-    ref_ngrams = [ref_tokens[i:i+n] for i in range(len(ref_tokens)-n+1)]
-    pred_ngrams = [pred_tokens[i:i+n] for i in range(len(pred_tokens)-n+1)]
-    
-    L_n = min(len(ref_ngrams), len(pred_ngrams))
-    if L_n == 0:
-        return 0
-    
-    # core part //author
-    total_distance = sum(
-        sum(token_distance(ref_token, pred_token) 
-            for ref_token, pred_token in zip(ref_ngram, pred_ngram))
-        for ref_ngram, pred_ngram in zip(ref_ngrams[:L_n], pred_ngrams[:L_n])
-    )
-    
-    return 1 - (total_distance / (L_n * n)) #1 - (total_distance / (L_n * n * max_d))
-
 load_GPT2_models()
 
+# An n-gram window pairs ref[k+j] with pred[k+j], so summing token distances over
+# the aligned n-grams reduces to the distance of each aligned position, weighted
+# by how many windows cover it; both are computed as whole tensors.
+def aligned_token_distances(ref_emb, ref_pos, pred_emb, pred_pos, w_emb=0.5, w_pos=0.5, alpha=2, beta=0.1):
+    """Token distance of every aligned (ref[i], pred[i]) pair, for tensors of shape (..., tokens, dim).
+
+    w_emb * (1 - cosine)^alpha + w_pos * tanh(beta * mean |pos difference|)
+    """
+    # Cosine in float32, the rest in float64, which keeps scores identical to the original per-token loop
+    emb_dist = (1 - torch.cosine_similarity(ref_emb, pred_emb, dim=-1).double()) ** alpha
+    pos_dist = torch.tanh(beta * torch.abs(ref_pos - pred_pos).float().mean(dim=-1).double())
+    return w_emb * emb_dist + w_pos * pos_dist
+
+def window_counts(positions, windows, n):
+    """How many of the first `windows` n-gram windows cover each position."""
+    first = torch.clamp(positions - n + 1, min=0)
+    last = torch.minimum(positions, windows - 1)
+    return torch.clamp(last - first + 1, min=0)
+
+def texbleu_scores(pairs, max_n=2, weights=None):
+    """TexBLEU for [((ref_emb, ref_pos), (pred_emb, pred_pos))] embedding tensors, all rows at once."""
+    if weights is None:
+        weights = [1/max_n] * max_n
+    if not pairs:
+        return []
+
+    ref_lengths = torch.tensor([len(ref_emb) for (ref_emb, _), _ in pairs])
+    pred_lengths = torch.tensor([len(pred_emb) for _, (pred_emb, _) in pairs])
+    aligned = torch.minimum(ref_lengths, pred_lengths)
+
+    # The aligned prefixes of all rows, concatenated: one distance per aligned token pair
+    sliced = [[tensor[:m] for tensor in (ref_emb, ref_pos, pred_emb, pred_pos)]
+              for ((ref_emb, ref_pos), (pred_emb, pred_pos)), m in zip(pairs, aligned.tolist())]
+    distances = aligned_token_distances(*(torch.cat(parts) for parts in zip(*sliced))).cpu()
+    rows = torch.repeat_interleave(torch.arange(len(pairs)), aligned)
+    positions = torch.arange(len(rows)) - (torch.cumsum(aligned, 0) - aligned)[rows]
+
+    n_gram_scores = []
+    for n in range(1, max_n + 1):
+        windows = aligned - n + 1
+        counts = window_counts(positions, windows[rows], n)
+        totals = torch.zeros(len(pairs), dtype=distances.dtype).index_add_(0, rows, counts * distances)
+        n_gram_scores.append([1 - total / (L_n * n) if L_n > 0 else 0
+                              for total, L_n in zip(totals.tolist(), windows.tolist())])
+
+    scores = []
+    for row in range(len(pairs)):
+        ref_length = int(ref_lengths[row])
+        pred_length = int(pred_lengths[row])
+        # Handle empty embeddings case explicitly
+        if ref_length == 0 or pred_length == 0:
+            scores.append(0.0)
+            continue
+        bp = 1 if pred_length > ref_length else math.exp(1 - ref_length / pred_length)
+        # Avoid log(0) explicitly
+        bleu_score = math.exp(sum(
+            w * math.log(max(s[row], 1e-10)) for w, s in zip(weights, n_gram_scores)
+        ))
+        scores.append(round(bleu_score * bp, 4))  # Apply brevity penalty
+    return scores
+
 def texbleu(reference, prediction, max_n=2, weights=None):
     ''' Computes the TexBLEU score, a BLEU-like metric for LaTeX equations using GPT-2 token embeddings.
         calculates n-gram similarities based on embedding and positional distances,
         and combines these with a brevity penalty to produce a similarity score between 0 and 1.
     '''    
-    if weights is None:
-        weights = [1/max_n] * max_n
-
-    ref_embeddings, ref_decoded_tokens = get_gpt2_token_embeddings(reference)
-    pred_embeddings, pred_decoded_tokens = get_gpt2_token_embeddings(prediction)
-
-    # Handle empty embeddings case explicitly
-    if len(ref_embeddings) == 0 or len(pred_embeddings) == 0:
-        return 0.0, ref_decoded_tokens, pred_decoded_tokens
-
-    n_gram_scores = [
-        n_gram_similarity(ref_embeddings, pred_embeddings, n) 
-        for n in range(1, max_n + 1)
-    ]
-    ref_length = len(ref_embeddings)
-    pred_length = len(pred_embeddings)
-
-    if pred_length == 0:
-        bp = 0
-    else:
-        bp = 1 if pred_length > ref_length else math.exp(1 - ref_length / pred_length)
-    # Avoid log(0) explicitly
-    bleu_score = math.exp(sum(
-        w * math.log(max(s, 1e-10)) for w, s in zip(weights, n_gram_scores)
-    ))
-
-    final_score = bleu_score * bp  # Apply brevity penalty
-
-    return round(final_score, 4), ref_decoded_tokens, pred_decoded_tokens
+    ref_emb, ref_pos, ref_decoded_tokens = get_gpt2_token_tensors(reference)
+    pred_emb, pred_pos, pred_decoded_tokens = get_gpt2_token_tensors(prediction)
+    score = texbleu_scores([((ref_emb, ref_pos), (pred_emb, pred_pos))], max_n, weights)[0]
+    return score, ref_decoded_tokens, pred_decoded_tokens
+
+def texbleu_batch(references, predictions, max_n=2, weights=None, batch_size=256):
+    ''' TexBLEU of many (reference, prediction) pairs, `batch_size` rows per tensor pass.
+        Same scores as texbleu(); repeated strings come from the shared token cache.
+    '''
+    def embed(text):
+        token_embeddings, pos_embeddings, _ = get_gpt2_token_tensors(text)
+        return token_embeddings, pos_embeddings
+
+    scores = []
+    for start in range(0, len(references), batch_size):
+        batch = zip(references[start:start + batch_size], predictions[start:start + batch_size])
+        scores.extend(texbleu_scores([(embed(ref), embed(pred)) for ref, pred in batch], max_n, weights))
+    return scores
 
 
 # Rouge L
@@ -110,8 +128,8 @@ def rouge_l_tokenized(reference, prediction):
     scorer = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
 
     # 2) Get GPT-2 decoded tokens
-    _, ref_tokens  = get_gpt2_token_embeddings(reference)
-    _, pred_tokens = get_gpt2_token_embeddings(prediction)
+    _, _, ref_tokens  = get_gpt2_token_tensors(reference)
+    _, _, pred_tokens = get_gpt2_token_tensors(prediction)
 
     # 3) Join into whitespace-delimited strings
     ref_for_rouge  = " ".join(ref_tokens)
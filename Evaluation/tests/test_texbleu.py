@@ -0,0 +1,112 @@
+"""Regression test: the vectorized TexBLEU must score exactly like the original per-token loop.
+
+    cd Evaluation && python -m pytest tests
+
+Runs on a fixed sample of the raw CSVs (cleaned as in metrics_evaluation.py)
+plus single-token and empty equations. Needs GPT-2 (transformers) like the
+metrics themselves.
+"""
+
+import glob
+import math
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+EVALUATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EVALUATION_DIR)
+# Data paths in config.py and utils.py are relative to Evaluation/
+os.chdir(EVALUATION_DIR)
+
+import pandas as pd
+import torch
+
+from config import RAW_CSV_DIR
+from static_metrics import texbleu, texbleu_batch
+from utils import clean_latex, get_gpt2_token_tensors
+
+SAMPLE_ROWS = 30
+
+
+# The original scalar implementation, one token pair at a time
+def cosine_distance(emb1, emb2):
+    return 1 - torch.cosine_similarity(emb1.unsqueeze(0), emb2.unsqueeze(0)).item()
+
+def token_distance(token1, token2, w_emb=0.5, w_pos=0.5, alpha=2, beta=0.1):
+    emb1, pos1 = token1
+    emb2, pos2 = token2
+    emb_dist = cosine_distance(emb1, emb2) ** alpha
+    pos_dist = math.tanh(beta * torch.abs(pos1 - pos2).float().mean().item())
+    return w_emb * emb_dist + w_pos * pos_dist
+
+def n_gram_similarity(ref_tokens, pred_tokens, n):
+    ref_ngrams = [ref_tokens[i:i+n] for i in range(len(ref_tokens)-n+1)]
+    pred_ngrams = [pred_tokens[i:i+n] for i in range(len(pred_tokens)-n+1)]
+    L_n = min(len(ref_ngrams), len(pred_ngrams))
+    if L_n == 0:
+        return 0
+    total_distance = sum(
+        sum(token_distance(ref_token, pred_token)
+            for ref_token, pred_token in zip(ref_ngram, pred_ngram))
+        for ref_ngram, pred_ngram in zip(ref_ngrams[:L_n], pred_ngrams[:L_n])
+    )
+    return 1 - (total_distance / (L_n * n))
+
+def reference_texbleu(reference, prediction, max_n=2):
+    weights = [1/max_n] * max_n
+    ref_emb, ref_pos, _ = get_gpt2_token_tensors(reference)
+    pred_emb, pred_pos, _ = get_gpt2_token_tensors(prediction)
+    ref_embeddings = list(zip(ref_emb, ref_pos))
+    pred_embeddings = list(zip(pred_emb, pred_pos))
+    if len(ref_embeddings) == 0 or len(pred_embeddings) == 0:
+        return 0.0
+    n_gram_scores = [n_gram_similarity(ref_embeddings, pred_embeddings, n) for n in range(1, max_n + 1)]
+    ref_length = len(ref_embeddings)
+    pred_length = len(pred_embeddings)
+    bp = 1 if pred_length > ref_length else math.exp(1 - ref_length / pred_length)
+    bleu_score = math.exp(sum(w * math.log(max(s, 1e-10)) for w, s in zip(weights, n_gram_scores)))
+    return round(bleu_score * bp, 4)
+
+
+def sample_pairs():
+    """(reference, prediction) pairs: sampled rows of every model CSV, then edge cases."""
+    pairs = []
+    for path in sorted(glob.glob(os.path.join(RAW_CSV_DIR, "*_results_evaluation_table.csv"))):
+        df = pd.read_csv(path)
+        df = df.sample(min(SAMPLE_ROWS, len(df)), random_state=0)
+        pairs += [(clean_latex(ref), clean_latex(pred))
+                  for ref, pred in zip(df['ground_truth_eq'], df['generated_equation'])]
+    if not pairs:
+        pytest.skip(f"No raw CSVs in {RAW_CSV_DIR}")
+    references = [ref for ref, _ in pairs if ref]
+    pairs += [
+        ("x", "x"), ("x", "y"), ("x", references[0]), (references[0], "x"),
+        (references[1], references[1][:1]),
+        ("", "x"), ("x", ""), ("", ""), ("", references[2]),
+    ]
+    return pairs
+
+
+PAIRS = sample_pairs()
+
+
+def test_texbleu_batch_matches_per_token_loop():
+    expected = [reference_texbleu(ref, pred) for ref, pred in PAIRS]
+    # A small batch size also covers rows split across tensor passes
+    for batch_size in (256, 7):
+        assert texbleu_batch([ref for ref, _ in PAIRS], [pred for _, pred in PAIRS], batch_size=batch_size) == expected
+
+
+def test_texbleu_matches_per_token_loop():
+    for ref, pred in PAIRS:
+        assert texbleu(ref, pred)[0] == reference_texbleu(ref, pred), (ref, pred)
+
+
+def test_single_token_identical_equation_is_not_one():
+    # No 2-gram: the 2-gram precision is 0, so TexBLEU is near 0 even for identical strings
+    assert reference_texbleu("x", "x") < 0.01
+    assert texbleu_batch(["x"], ["x"]) == [reference_texbleu("x", "x")]
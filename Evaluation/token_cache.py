@@ -0,0 +1,95 @@
+"""Tokenization/embedding cache shared by the GPT-2 based metrics (TexBLEU, ROUGE-L)."""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Token ids saved by an older tokenizer setup are ignored
+TOKENIZER = {"name": "gpt2", "max_length": 512}
+
+
+class TokenCache:
+    """LRU of (token ids, decoded tokens, token embeddings), keyed by the cleaned LaTeX string.
+
+    Bounded by the total size of the embedding tensors (`max_bytes`; 0 turns
+    it off). Positional embeddings are a slice of one shared table, so they
+    are not stored. Token ids of the strings still in the LRU can be saved to
+    a JSON file and loaded by later runs, which then only look up the
+    embeddings; the file is bounded by the same budget as the cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        # Token ids read from a saved file; strings tokenized this run live in `entries`
+        self.saved_ids = {}
+        self.hits = 0
+        self.misses = 0
+        self.reused_ids = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _size(token_embeddings):
+        return token_embeddings.numel() * token_embeddings.element_size()
+
+    def get(self, text):
+        """Return the cached (token_ids, decoded_tokens, token_embeddings) of `text`, or None."""
+        with self.lock:
+            entry = self.entries.get(text)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(text)
+            self.hits += 1
+            return entry
+
+    def token_ids(self, text):
+        """Token ids of `text` saved by an earlier run, or None."""
+        with self.lock:
+            token_ids = self.saved_ids.get(text)
+            if token_ids is not None:
+                self.reused_ids += 1
+            return token_ids
+
+    def put(self, text, token_ids, decoded_tokens, token_embeddings):
+        """Store an entry, evicting the least recently used ones if over budget; returns the entry."""
+        entry = (tuple(token_ids), tuple(decoded_tokens), token_embeddings)
+        with self.lock:
+            if text in self.entries:
+                self.bytes -= self._size(self.entries.pop(text)[2])
+            self.entries[text] = entry
+            self.bytes += self._size(token_embeddings)
+            while self.bytes > self.max_bytes and self.entries:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.bytes -= self._size(evicted)
+        return entry
+
+    def load(self, path):
+        """Read token ids saved by `save`; returns how many strings were loaded."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("tokenizer") != TOKENIZER:
+            return 0
+        with self.lock:
+            self.saved_ids.update(data["ids"])
+        return len(data["ids"])
+
+    def save(self, path):
+        """Write the token ids of the cached entries (atomically)."""
+        with self.lock:
+            data = {"tokenizer": TOKENIZER, "ids": {text: list(entry[0]) for text, entry in self.entries.items()}}
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        if lookups:
+            print(f"Token cache: {self.hits}/{lookups} lookups reused ({self.hits / lookups:.1%}), "
+                  f"{self.reused_ids} strings tokenized by an earlier run, "
+                  f"{len(self.entries)} entries ({self.bytes / 1024 ** 2:.1f} MB)")
@@ -1,11 +1,15 @@
 #This file contains code for cleaning the csv, latex string, NAN, load embeding model, tokenizarion
 import re
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 import torch
 import numpy as np
 from transformers import GPT2TokenizerFast, GPT2Model
 from transformers import AutoTokenizer, AutoModel
+from config import EMBEDDING_TABLE_PATH, TOKEN_CACHE_MAX_BYTES
+from embedding_table import POSITION_SCALE, EmbeddingTable
+from token_cache import TokenCache
 
 
 
@@ -55,26 +59,51 @@ def clean_latex(latex_str):
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 #print(f"Using device: {device}")
 
-def load_GPT2_models():
-    global gpt2_tokenizer, gpt2_model, gpt2_embedding_layer, gpt2_positional_embedding, new_embeddings
-    
-    gpt2_tokenizer = GPT2TokenizerFast.from_pretrained('gpt2')
+NEW_EMBEDDINGS_PATH = 'new_embeddings.pth'
+
+def load_gpt2_weights():
+    """
+    GPT-2 token embedding weights, with the rows of new_embeddings.pth appended if present,
+    and positional embedding weights
+    """
     gpt2_model = GPT2Model.from_pretrained('gpt2')
-    gpt2_embedding_layer = gpt2_model.wte.to(device)
-    gpt2_positional_embedding = gpt2_model.wpe.to(device)
+    token_weight = gpt2_model.wte.weight.detach()
 
     try:
         if device == 'cuda':
-            new_embeddings_state = torch.load('new_embeddings.pth')
+            new_embeddings_state = torch.load(NEW_EMBEDDINGS_PATH)
         else:
-            new_embeddings_state = torch.load('new_embeddings.pth', map_location=torch.device('cpu'))
+            new_embeddings_state = torch.load(NEW_EMBEDDINGS_PATH, map_location=torch.device('cpu'))
 
-        new_vocab_size, embedding_dim = new_embeddings_state['weight'].shape
-        new_embeddings = torch.nn.Embedding(new_vocab_size, embedding_dim).to(device)
-        new_embeddings.load_state_dict(new_embeddings_state)
+        token_weight = torch.cat([token_weight, new_embeddings_state['weight'].detach().to(token_weight.device)])
     except FileNotFoundError:
         print("Warning: new_embeddings.pth not found. Using default embeddings.")
-        new_embeddings = None
+
+    return token_weight, gpt2_model.wpe.weight.detach()
+
+def load_GPT2_models():
+    """
+    Load the tokenizer and the embedding tables: the memory-mapped table from
+    embedding_table.py if it has been built, otherwise GPT-2 itself
+    """
+    global gpt2_tokenizer, embedding_table, token_table, position_table
+
+    gpt2_tokenizer = GPT2TokenizerFast.from_pretrained('gpt2')
+
+    if EmbeddingTable.exists(EMBEDDING_TABLE_PATH):
+        embedding_table = EmbeddingTable(EMBEDDING_TABLE_PATH)
+        token_table = None
+        position_table = embedding_table.position_tensor(device)
+        if embedding_table.is_stale(NEW_EMBEDDINGS_PATH):
+            print(f"Warning: {NEW_EMBEDDINGS_PATH} changed since {EMBEDDING_TABLE_PATH} was built. "
+                  f"Rebuild it with embedding_table.py.")
+        return
+
+    # Merge the token tables once here rather than on every lookup
+    embedding_table = None
+    token_weight, position_weight = load_gpt2_weights()
+    token_table = token_weight.to(device)
+    position_table = (position_weight * POSITION_SCALE).to(device)
 
 
 def spacing(text):
@@ -89,24 +118,35 @@ def spacing(text):
             result.append(char)
     return ''.join(result)
 
-def get_gpt2_token_embeddings(sentence):
-    sentence = spacing(sentence)
-    tokens = gpt2_tokenizer.encode(sentence, truncation=True, max_length=512)
-    decoded_tokens = [gpt2_tokenizer.decode([token]) for token in tokens]
+@lru_cache(maxsize=None)
+def decode_token(token_id):
+    """Text of one GPT-2 token; the vocabulary is fixed, so each id is decoded once."""
+    return gpt2_tokenizer.decode([token_id])
 
-    token_ids = torch.tensor(tokens, dtype=torch.long).unsqueeze(0).to(device)
-    positions = torch.arange(0, token_ids.size(1)).unsqueeze(0).to(device)
+# Shared by every metric that tokenizes with GPT-2
+token_cache = TokenCache(TOKEN_CACHE_MAX_BYTES)
 
-    if new_embeddings is not None:
-        token_embeddings = torch.cat([gpt2_embedding_layer.weight, new_embeddings.weight])[token_ids]
-    else:
-        token_embeddings = gpt2_embedding_layer(token_ids)
+def embed_tokens(token_ids):
+    """Token embeddings of a token id sequence as an (n_tokens, dim) tensor"""
+    if embedding_table is not None:
+        return embedding_table.lookup(token_ids, device)
+    return token_table[torch.tensor(token_ids, dtype=torch.long).to(device)]
 
-    pos_embeddings = gpt2_positional_embedding(positions) * 100
-
-    embeddings = list(zip(token_embeddings[0], pos_embeddings[0]))
-
-    return embeddings, decoded_tokens
+def get_gpt2_token_tensors(sentence):
+    """
+    Token and (scaled) positional embeddings of a sentence as (n_tokens, dim) tensors,
+    plus its decoded tokens; served from token_cache when the sentence was seen before
+    """
+    entry = token_cache.get(sentence)
+    if entry is None:
+        tokens = token_cache.token_ids(sentence)
+        if tokens is None:
+            tokens = gpt2_tokenizer.encode(spacing(sentence), truncation=True, max_length=512)
+        decoded_tokens = [decode_token(token) for token in tokens]
+        entry = token_cache.put(sentence, tokens, decoded_tokens, embed_tokens(tokens))
+
+    tokens, decoded_tokens, token_embeddings = entry
+    return token_embeddings, position_table[:len(tokens)], list(decoded_tokens)
 
 
 # MathBERT for tokenization
@@ -0,0 +1,164 @@
+"""Batch-API clients: submit many prompts as one job, poll, and fetch results.
+
+Every client exposes the same three calls:
+    submit(requests, system=None) -> batch_id   requests is a list of (custom_id, prompt)
+    status(batch_id)   -> "in_progress" | "ended"
+    results(batch_id)  -> {custom_id: text} for the requests that succeeded
+"""
+
+import io
+import json
+import os
+import uuid
+from llm_client import anthropic_params, chat_messages
+
+
+class OpenAIBatchClient:
+    """OpenAI Batch API (/v1/chat/completions endpoint, 24h window)."""
+
+    def __init__(self, config, api_key):
+        from common.client_registry import get_client
+        self.config = config
+        self.client = get_client("openai", api_key, config.base_url)
+
+    def submit(self, requests, system=None):
+        lines = []
+        for custom_id, prompt in requests:
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.config.model,
+                    "messages": chat_messages(prompt, system),
+                    "max_tokens": self.config.max_tokens,
+                    "temperature": self.config.temperature,
+                },
+            }, ensure_ascii=False))
+        payload = io.BytesIO("\n".join(lines).encode("utf-8"))
+        input_file = self.client.files.create(file=("batch_input.jsonl", payload), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            return "ended"
+        return "in_progress"
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        outputs = {}
+        if not batch.output_file_id:
+            return outputs
+        content = self.client.files.content(batch.output_file_id).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                outputs[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        return outputs
+
+
+class AnthropicBatchClient:
+    """Anthropic Message Batches API."""
+
+    def __init__(self, config, api_key):
+        from common.client_registry import get_client
+        self.config = config
+        self.client = get_client("anthropic", api_key, config.base_url)
+
+    def submit(self, requests, system=None):
+        batch = self.client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": anthropic_params(self.config, prompt, system)}
+            for custom_id, prompt in requests
+        ])
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.client.messages.batches.retrieve(batch_id)
+        return "ended" if batch.processing_status == "ended" else "in_progress"
+
+    def results(self, batch_id):
+        outputs = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                outputs[entry.custom_id] = entry.result.message.content[0].text
+        return outputs
+
+
+class LocalBatchClient:
+    """File-based stand-in for a batch service, for testing the submit/poll/merge cycle.
+
+    Each batch is a directory holding `input.jsonl`; the batch has ended once
+    `output.jsonl` appears next to it. If `responder` is given, it is called
+    with each prompt on the first poll to write that file, otherwise some other
+    process is expected to do it.
+    """
+
+    def __init__(self, batch_dir, responder=None):
+        self.batch_dir = batch_dir
+        self.responder = responder
+
+    def _path(self, batch_id, name):
+        return os.path.join(self.batch_dir, batch_id, name)
+
+    def submit(self, requests, system=None):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.batch_dir, batch_id))
+        with open(self._path(batch_id, "input.jsonl"), 'w', encoding='utf-8') as f:
+            for custom_id, prompt in requests:
+                f.write(json.dumps({"custom_id": custom_id, "system": system, "prompt": prompt}, ensure_ascii=False) + "\n")
+        return batch_id
+
+    def status(self, batch_id):
+        if not os.path.exists(self._path(batch_id, "output.jsonl")) and self.responder:
+            complete_local_batch(self.batch_dir, batch_id, self.responder)
+        return "ended" if os.path.exists(self._path(batch_id, "output.jsonl")) else "in_progress"
+
+    def results(self, batch_id):
+        outputs = {}
+        with open(self._path(batch_id, "output.jsonl"), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("error") is None:
+                        outputs[record["custom_id"]] = record["text"]
+        return outputs
+
+
+def complete_local_batch(batch_dir, batch_id, responder):
+    """Play the batch service: answer every request in a local batch with `responder(prompt)`."""
+    batch_path = os.path.join(batch_dir, batch_id)
+    records = []
+    with open(os.path.join(batch_path, "input.jsonl"), 'r', encoding='utf-8') as f:
+        for line in f:
+            request = json.loads(line)
+            try:
+                records.append({"custom_id": request["custom_id"], "text": responder(request["prompt"]), "error": None})
+            except Exception as e:
+                records.append({"custom_id": request["custom_id"], "text": None, "error": str(e)})
+
+    # Write then rename, so a poller never sees a half-written output file
+    tmp_path = os.path.join(batch_path, "output.jsonl.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, os.path.join(batch_path, "output.jsonl"))
+
+
+def create_batch_client(config, api_key, local_dir=None):
+    """Create a batch client for the provider, or the local stand-in if `local_dir` is set."""
+    if local_dir:
+        return LocalBatchClient(local_dir)
+    if config.provider == "openai":
+        return OpenAIBatchClient(config, api_key)
+    if config.provider == "anthropic":
+        return AnthropicBatchClient(config, api_key)
+    raise ValueError(f"Batch mode is not supported for provider: {config.provider}")
@@ -0,0 +1,89 @@
+"""Offline throughput benchmark: run MathGenerator against common/mock_server.py.
+
+    python benchmark.py --llm gpt-4o-mini --papers 10 --latency lognormal:0.5,0.5 --rate-limit 0.02
+
+Reports end-to-end equations/sec and the time spent checkpointing (journal
+appends and compaction), so regressions in the generation loop show up
+without calling a real API. Outputs go to a temporary directory.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+import config
+from common.client_registry import POOLED_PROVIDERS, configure as configure_pool
+from common.mock_server import MockLLMServer
+from common.rate_limiter import RateLimiter
+from generator import PROMPT_LAYOUTS, MathGenerator, load_dataset
+
+
+def timed(stats, name, fn):
+    """Wrap `fn` so its calls and total run time are added to `stats`."""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats[name] += time.perf_counter() - start
+            stats[f"{name}_calls"] += 1
+    return wrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generation loop against a local mock API server.")
+    parser.add_argument('--llm', default="gpt-4o-mini", help='LLM config to benchmark (its provider picks the mock API flavour)')
+    parser.add_argument('--papers', type=int, default=5, help='Number of papers to generate for (default: 5)')
+    parser.add_argument('--concurrency', type=int, help='Maximum parallel requests (defaults to the per-model limit)')
+    parser.add_argument('--prompt-layout', choices=PROMPT_LAYOUTS, help="Default: the model's prompt_layout")
+    parser.add_argument('--stream', action=argparse.BooleanOptionalAction, default=None, help='Stream responses')
+    parser.add_argument('--latency', default="lognormal:0.5,0.5",
+                        help='Mock time to first token: fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--tokens-per-sec', type=float, default=0, help='Mock decode speed for streamed answers (0 = instant)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Fraction of mock requests rejected with 429')
+    parser.add_argument('--max-connections', type=int, help='Cap on concurrent HTTP connections to the mock (OpenAI, DeepSeek and Anthropic models; default: 32)')
+    parser.add_argument('--keep-limits', action='store_true', help="Apply the model's requests/tokens per minute limits")
+    args = parser.parse_args()
+
+    llm_config = config.LLMS[args.llm]
+    os.environ.setdefault(llm_config.api_key, "mock")
+    # Keep benchmark results and logs out of Generation/outputs
+    config.OUTPUT_DIR = tempfile.mkdtemp(prefix="math_benchmark_")
+
+    if args.max_connections:
+        if llm_config.provider in POOLED_PROVIDERS:
+            configure_pool(llm_config.provider, max_connections=args.max_connections)
+        else:
+            print(f"⚠️  --max-connections does not apply to {llm_config.provider} models; their SDK manages its own connections")
+
+    with MockLLMServer(latency=args.latency, tokens_per_sec=args.tokens_per_sec, rate_limit=args.rate_limit) as server:
+        base_url = server.url if llm_config.provider == "anthropic" else f"{server.url}/v1"
+        dataset = load_dataset()
+        generator = MathGenerator(args.llm, use_cache=False, prompt_layout=args.prompt_layout,
+                                  stream=args.stream, dataset=dataset, base_url=base_url)
+        if not args.keep_limits:
+            generator.rate_limiter = RateLimiter()
+
+        stats = defaultdict(float)
+        generator.journal.append = timed(stats, "append", generator.journal.append)
+        generator.journal.compact = timed(stats, "compact", generator.journal.compact)
+
+        paper_ids = dataset.paper_ids()[:args.papers]
+        start = time.perf_counter()
+        generator.generate_all(fresh=True, paper_ids=paper_ids, concurrency=args.concurrency)
+        wall = time.perf_counter() - start
+        generator.journal.close()
+
+    generated = int(stats["append_calls"])
+    checkpoint = stats["append"] + stats["compact"]
+    print(f"\n⏱️  Benchmark: {generated} equations in {wall:.2f}s -> {generated / wall:.2f} equations/sec")
+    if generated:
+        print(f"💾 Checkpointing: {stats['append']:.3f}s over {generated} journal appends "
+              f"({stats['append'] / generated * 1000:.2f} ms each), {stats['compact']:.3f}s compacting "
+              f"({int(stats['compact_calls'])}x) = {checkpoint / wall * 100:.1f}% of wall time")
+    print(f"🧪 Mock server: {server.requests} requests, {server.rate_limited} rate-limited | outputs in {config.OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """Configuration for math generation."""
 
 import os
+import sys
 from dataclasses import dataclass
 
 @dataclass
@@ -9,6 +10,28 @@ class LLMConfig:
     model: str  
     api_key: str
     base_url: str = None
+    # Sampling parameters (max_tokens=None leaves the provider default)
+    temperature: float = 0.2
+    max_tokens: int = 1024
+    # Stream responses and cancel once </latex> and </description> have both been seen
+    stream: bool = False
+    # Prompt layout when --prompt-layout is not given (see generator.PROMPT_LAYOUTS)
+    prompt_layout: str = "inline"
+    # Throughput limits: parallel requests, requests/min and tokens/min (0 = unlimited)
+    max_concurrency: int = 4
+    requests_per_minute: int = 60
+    tokens_per_minute: int = 0
+    # Retries (with exponential backoff) for rate-limit, timeout, connection and server errors
+    max_retries: int = 3
+    # Planning figures for --estimate: USD per 1M tokens, decode speed, latency
+    # before the first token, and output length when no actual usage is logged yet
+    input_price: float = 0.0
+    output_price: float = 0.0
+    output_tokens_per_sec: float = 50.0
+    first_token_latency: float = 1.0
+    expected_output_tokens: int = 150
+    # Local transformers backend only: "cpu", "cuda", ... (None = cuda if available)
+    device: str = None
 
 # Dataset and output paths
 # DATASET_PATH = "D:/0_Master_Thesis/math_agent/dataset/test_dataset.json"
@@ -16,32 +39,81 @@ class LLMConfig:
 # This calculates the path from this file's location (Generation) -> up to the project root -> then into 'dataset'
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__),  '..'))
 DATASET_PATH = os.path.join(PROJECT_ROOT, "Dataset", "academic_dataset_Final.json")
+
+# Code shared with Evaluation lives in the `common` package at the project root
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "outputs")
 
+# Response cache shared by all models (keyed by provider, model, prompt and sampling parameters)
+CACHE_PATH = os.path.join(OUTPUT_DIR, "response_cache.sqlite")
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+
 # LLM configurations
 LLMS = {
     # OpenAI
-    "gpt-o1-mini": LLMConfig("openai", "gpt-o1-mini", "OPENAI_API_KEY"),
-    "gpt-4o-mini": LLMConfig("openai", "gpt-4o-mini", "OPENAI_API_KEY"),
-    "gpt-4.1-mini": LLMConfig("openai", "gpt-4.1-mini", "OPENAI_API_KEY"),
-    "gpt-4.1": LLMConfig("openai", "gpt-4.1", "OPENAI_API_KEY"),
-    # Anthropic  
-    "claude": LLMConfig("anthropic", "claude-3-5-sonnet-20241022", "ANTHROPIC_API_KEY"),
-    
-    # Deepseek
-    "deepseek-R1": LLMConfig("deepseek", "deepseek-reasoner", "DeepSeek_API_Key", "https://api.deepseek.com"),
+    "gpt-o1-mini": LLMConfig(
+        "openai", "gpt-o1-mini", "OPENAI_API_KEY",
+        max_concurrency=8, requests_per_minute=500, tokens_per_minute=200000,
+        input_price=1.10, output_price=4.40, output_tokens_per_sec=80, first_token_latency=5.0, expected_output_tokens=1000),
+    "gpt-4o-mini": LLMConfig(
+        "openai", "gpt-4o-mini", "OPENAI_API_KEY",
+        max_concurrency=8, requests_per_minute=500, tokens_per_minute=200000,
+        input_price=0.15, output_price=0.60, output_tokens_per_sec=70),
+    "gpt-4.1-mini": LLMConfig(
+        "openai", "gpt-4.1-mini", "OPENAI_API_KEY",
+        max_concurrency=8, requests_per_minute=500, tokens_per_minute=200000,
+        input_price=0.40, output_price=1.60, output_tokens_per_sec=70),
+    "gpt-4.1": LLMConfig(
+        "openai", "gpt-4.1", "OPENAI_API_KEY",
+        max_concurrency=8, requests_per_minute=500, tokens_per_minute=30000,
+        input_price=2.00, output_price=8.00, output_tokens_per_sec=50),
+    # Anthropic
+    "claude": LLMConfig(
+        "anthropic", "claude-3-5-sonnet-20241022", "ANTHROPIC_API_KEY",
+        requests_per_minute=50, tokens_per_minute=40000,
+        input_price=3.00, output_price=15.00, output_tokens_per_sec=60),
+
+    # Deepseek (reasoning tokens are billed as output, and max_tokens would cap them too)
+    "deepseek-R1": LLMConfig(
+        "deepseek", "deepseek-reasoner", "DeepSeek_API_Key", "https://api.deepseek.com",
+        max_tokens=None, stream=True, max_concurrency=16, requests_per_minute=0,
+        input_price=0.55, output_price=2.19, output_tokens_per_sec=25, first_token_latency=3.0, expected_output_tokens=1500),
 
     # Together AI
-    "llama3.3-70B": LLMConfig("together", "meta-llama/Llama-3.3-70B-Instruct-Turbo", "TOGETHER_API_KEY", "https://api.together.xyz/v1"),
-    "qwen3-235B": LLMConfig("together", "Qwen/Qwen3-235B-A22B-fp8-tput", "TOGETHER_API_KEY", "https://api.together.xyz/v1"),
-    "qwen-qwq-32B": LLMConfig("together", "Qwen/QwQ-32B", "TOGETHER_API_KEY", "https://api.together.xyz/v1"),
-    
-    
+    "llama3.3-70B": LLMConfig(
+        "together", "meta-llama/Llama-3.3-70B-Instruct-Turbo", "TOGETHER_API_KEY", "https://api.together.xyz/v1",
+        max_concurrency=8, requests_per_minute=600,
+        input_price=0.88, output_price=0.88, output_tokens_per_sec=80),
+    "qwen3-235B": LLMConfig(
+        "together", "Qwen/Qwen3-235B-A22B-fp8-tput", "TOGETHER_API_KEY", "https://api.together.xyz/v1",
+        max_concurrency=8, requests_per_minute=600,
+        input_price=0.20, output_price=0.60, output_tokens_per_sec=40, expected_output_tokens=300),
+    "qwen-qwq-32B": LLMConfig(
+        "together", "Qwen/QwQ-32B", "TOGETHER_API_KEY", "https://api.together.xyz/v1",
+        max_concurrency=8, requests_per_minute=600,
+        input_price=1.20, output_price=1.20, output_tokens_per_sec=40, expected_output_tokens=800),
+
+
     # Hugging Face
-    "qwen-math": LLMConfig("huggingface", "Qwen/Qwen2.5-Math-1.5B", "HF_API_KEY"),
-    "deepseek-math": LLMConfig("huggingface", "deepseek-ai/deepseek-math-7b-instruct", "HF_API_KEY"),
+    "qwen-math": LLMConfig(
+        "huggingface", "Qwen/Qwen2.5-Math-1.5B", "HF_API_KEY",
+        max_concurrency=2, requests_per_minute=30),
+    "deepseek-math": LLMConfig(
+        "huggingface", "deepseek-ai/deepseek-math-7b-instruct", "HF_API_KEY",
+        max_concurrency=2, requests_per_minute=30),
+
+    # Local transformers (no API key); max_concurrency is the batch size. The cached layout puts
+    # the paper header and prior equations in the shared prefix whose KV cache is reused
+    "qwen-math-local": LLMConfig(
+        "transformers", "Qwen/Qwen2.5-Math-1.5B-Instruct", None,
+        max_tokens=512, prompt_layout="cached", max_concurrency=8, requests_per_minute=0,
+        output_tokens_per_sec=20, first_token_latency=2.0),
 }
 
+# Models benchmarked in the evaluation; `--llm all` runs these together
+TRACKED_LLMS = ["gpt-4o-mini", "gpt-4.1", "deepseek-R1", "llama3.3-70B", "qwen3-235B"]
+
 def get_llm_config(name):
     """Get LLM configuration by name."""
     if name not in LLMS:
@@ -49,12 +121,20 @@ def get_llm_config(name):
         raise ValueError(f"Unknown LLM '{name}'. Available: {available}")
     
     config = LLMS[name]
+    if config.api_key is None:
+        # Local models need no key
+        return config, None
     api_key = os.getenv(config.api_key)
     if not api_key:
         raise ValueError(f"API key not found: {config.api_key}")
     
     return config, api_key
 
+def get_cache_path():
+    """Get response cache path."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    return CACHE_PATH
+
 def get_output_path(llm_name):
     """Get output file path for LLM."""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
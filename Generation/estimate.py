@@ -0,0 +1,97 @@
+"""Pre-flight token, wall-time and cost estimates for a generation run."""
+
+import heapq
+from collections import defaultdict
+from common.rate_limiter import estimate_tokens
+from llm_client import prompt_text
+
+
+def get_token_counter(config):
+    """Return a `count(text)` function using a local tokenizer for the model.
+
+    tiktoken is exact for OpenAI models and a close proxy for the others; if it
+    is not installed we fall back to the 4-characters-per-token rule.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        print("⚠️  tiktoken not installed; using a 4 chars/token approximation")
+        return estimate_tokens
+
+    try:
+        encoding = tiktoken.encoding_for_model(config.model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def count_prompt_tokens(prompts, count):
+    """Count input tokens for (paper_id, eq_id, prompt, system) tuples.
+
+    Returns ({paper_id: total_tokens}, [(tokens, paper_id, eq_id), ...]).
+    """
+    per_paper = defaultdict(int)
+    per_prompt = []
+    for paper_id, eq_id, prompt, system in prompts:
+        tokens = count(prompt_text(prompt)) + (count(system) if system else 0)
+        per_paper[paper_id] += tokens
+        per_prompt.append((tokens, paper_id, eq_id))
+    return per_paper, per_prompt
+
+
+def mean_output_tokens(config, records):
+    """Average output tokens per request from logged usage, else the configured guess."""
+    observed = [r["output_tokens"] for r in records
+                if not r.get("from_cache") and r.get("output_tokens") is not None]
+    if observed:
+        return sum(observed) / len(observed), f"measured over {len(observed)} requests"
+    return config.expected_output_tokens, "config estimate"
+
+
+def project_run(config, input_tokens, requests, output_per_request, concurrency):
+    """Project wall time (seconds) and cost (USD) for a run.
+
+    Throughput is the tightest of: the concurrency limit over per-request
+    latency, requests/min, and tokens/min.
+    """
+    if not requests:
+        return 0.0, 0.0
+    latency = config.first_token_latency + output_per_request / config.output_tokens_per_sec
+    tokens_per_request = input_tokens / requests + output_per_request
+
+    rates = [concurrency / latency]
+    if config.requests_per_minute:
+        rates.append(config.requests_per_minute / 60)
+    if config.tokens_per_minute:
+        rates.append(config.tokens_per_minute / 60 / tokens_per_request)
+    wall_time = requests / min(rates)
+
+    cost = (input_tokens * config.input_price + requests * output_per_request * config.output_price) / 1_000_000
+    return wall_time, cost
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+
+def print_estimate(config, per_paper, per_prompt, records, concurrency, top=5, detailed=True):
+    """Print the token breakdown and projected wall time and cost."""
+    requests = len(per_prompt)
+    input_tokens = sum(per_paper.values())
+    output_per_request, source = mean_output_tokens(config, records)
+    wall_time, cost = project_run(config, input_tokens, requests, output_per_request, concurrency)
+
+    print(f"🔮 Pending: {requests} prompts, {input_tokens:,} input tokens "
+          f"(~{output_per_request:.0f} output tokens/request, {source})")
+    print(f"   Projected wall time: {format_duration(wall_time)} at {concurrency} parallel requests | "
+          f"Projected cost: ${cost:.2f}")
+
+    if detailed and requests:
+        print(f"\n📄 Input tokens per paper (top {top}):")
+        for paper_id, tokens in heapq.nlargest(top, per_paper.items(), key=lambda item: item[1]):
+            print(f"  {paper_id:30} {tokens:>10,}")
+        print(f"\n📏 Largest prompts (top {top}):")
+        for tokens, paper_id, eq_id in heapq.nlargest(top, per_prompt):
+            print(f"  {paper_id}-{eq_id:10} {tokens:>10,}")
@@ -1,62 +1,107 @@
 """Main equation generation logic."""
 
+import glob
 import json
 import os
+import random
+import threading
 import time
-from config import DATASET_PATH, get_llm_config, get_output_path
-from llm_client import create_client
-from utils import build_combined_context, construct_final_prompt
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import replace
+# config first: it puts the project root on sys.path so `common` can be imported
+from config import CACHE_MAX_BYTES, DATASET_PATH, get_cache_path, get_llm_config, get_output_path
+from batch_client import create_batch_client
+from estimate import count_prompt_tokens, get_token_counter, print_estimate
+from common.dataset_index import DatasetIndex
+from common.rate_limiter import RateLimiter, estimate_tokens
+from journal import ResultJournal
+from llm_client import RETRYABLE_ERRORS, Completion, RequestFailed, classify_error, create_client, prompt_text
+from request_log import RequestLog, read_request_log, summarize_latency, summarize_usage
+from common.response_cache import ResponseCache
+from response_cache import request_key
+from utils import (construct_cached_prompt, construct_final_prompt, get_system_prompt, iter_context_parts,
+                   render_combined_context)
+
+
+PROMPT_LAYOUTS = ("inline", "cached")
+# Papers whose prompts a multi-model run keeps for the models that reach them later
+SHARED_PROMPT_PAPERS = 8
+
+
+def load_dataset():
+    """Open the compiled dataset index (built from the JSON on first use)."""
+    return DatasetIndex(DATASET_PATH)
 
 
 class MathGenerator:
-    def __init__(self, llm_name):
+    def __init__(self, llm_name, use_cache=True, prompt_layout=None, stream=None, dataset=None, base_url=None,
+                 worker_id=None):
         self.llm_name = llm_name
         self.config, self.api_key = get_llm_config(llm_name)
+        # None uses the model's default layout
+        self.prompt_layout = prompt_layout or self.config.prompt_layout
+        if self.prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout '{self.prompt_layout}'. Available: {', '.join(PROMPT_LAYOUTS)}")
+        if stream is not None:
+            self.config = replace(self.config, stream=stream)
+        if base_url:
+            self.config = replace(self.config, base_url=base_url)
         self.output_path = get_output_path(llm_name)
+        self.batch_state_path = self.output_path.replace('_results.json', '_batch.json')
+        self.journal_path = self.output_path.replace('_results.json', '_journal.jsonl')
+        self.request_log_path = self.output_path.replace('_results.json', '_requests.jsonl')
+        # Queue workers keep their own journal and request log; --merge folds them in
+        self.worker_id = worker_id
+        if worker_id:
+            self.journal_path = self.output_path.replace('_results.json', f'_worker-{worker_id}_journal.jsonl')
+            self.request_log_path = self.output_path.replace('_results.json', f'_worker-{worker_id}_requests.jsonl')
+        self.cache = ResponseCache(get_cache_path(), CACHE_MAX_BYTES) if use_cache else None
         self.generate_fn = create_client(self.config, self.api_key)
+        self.rate_limiter = RateLimiter(self.config.requests_per_minute, self.config.tokens_per_minute)
+        self.stop_event = threading.Event()
         
-        # Load data
-        self.equations = self.load_dataset()
+        # Load data (several generators can share one dataset index)
+        self.dataset = dataset if dataset is not None else load_dataset()
         self.results = self.load_results()
         
         print(f"🤖 Using {llm_name} ({self.config.model})")
         self.print_stats()
     
-    def load_dataset(self):
-        """Load equations from dataset."""
-        with open(DATASET_PATH, 'r', encoding='utf-8') as f:
-            dataset = json.load(f)
-        
-        equations = []
-        for paper in dataset:
-            for eq in paper['equations']:
-                equations.append({
-                    'paper_id': paper['id'],
-                    'equation_id': eq['equation id'],
-                    'context': eq['context'],
-                    'description': eq.get('description', ''),
-                    'EQ_latex': eq.get('EQ_latex', [])
-                })
-        return equations
-    
     def load_results(self):
-        """Load existing results."""
+        """Load the last compacted results, then replay the journal on top."""
+        results = {}
         if os.path.exists(self.output_path):
             try:
                 with open(self.output_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+                    results = json.load(f)
+            except json.JSONDecodeError as e:
+                # Refuse to continue: starting from {} would overwrite the file on the next save
+                raise ValueError(f"Results file {self.output_path} is corrupt ({e}); "
+                                 f"fix or move it before resuming") from e
+        
+        self.journal = ResultJournal(self.journal_path)
+        replayed = self.journal.replay(results)
+        if replayed:
+            print(f"📒 Replayed {replayed} journaled results")
+        return results
+    
+    def record_result(self, paper_id, eq_id, output):
+        """Store one result and append it to the checkpoint journal."""
+        output = output.strip()
+        self.results.setdefault(paper_id, {})[eq_id] = output
+        self.journal.append(paper_id, eq_id, output)
     
     def save_results(self):
-        """Save results to file."""
-        with open(self.output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, indent=2, ensure_ascii=False)
+        """Compact the journal into the results file (queue workers only sync their journal)."""
+        if self.worker_id:
+            self.journal.sync()
+            return
+        self.journal.compact(self.results, self.output_path)
     
     def print_stats(self):
         """Print progress statistics."""
-        total = len(self.equations)
+        total = len(self.dataset)
         done = sum(len(paper) for paper in self.results.values())
         pending = total - done
         progress = (done / total * 100) if total > 0 else 0
@@ -64,71 +109,340 @@ class MathGenerator:
         print(f"📊 Progress: {done}/{total} ({progress:.1f}%) | Pending: {pending}")
     
     def get_pending_equations(self, paper_ids=None):
-        """Get equations that need to be processed."""
-        pending = []
-        for eq in self.equations:
-            paper_id = eq['paper_id']
-            equation_id = eq['equation_id']
-            
-            # Filter by paper_ids if specified
-            if paper_ids and paper_id not in paper_ids:
-                continue
-            
-            # Skip if already done
-            if paper_id in self.results and equation_id in self.results[paper_id]:
-                continue
-            
-            pending.append(eq)
-        return pending
+        """Get (paper_id, equation_id) keys that need to be processed, in dataset order."""
+        return [
+            (paper_id, equation_id) for paper_id, equation_id in self.dataset.keys(paper_ids)
+            if equation_id not in self.results.get(paper_id, {})
+        ]
+    
+    def iter_prompts(self, pending):
+        """Yield (paper_id, eq_id, prompt, system) for pending keys in the configured layout.
+        
+        "inline" is the original single-message prompt. "cached" moves the
+        instructions into the system prompt and orders the user message
+        most-stable first (see construct_cached_prompt), so consecutive
+        equations of a paper share a long prefix for provider prompt caching.
+        Context text is loaded one paper at a time.
+        """
+        include = set(pending)
+        for paper_id in dict.fromkeys(paper_id for paper_id, _ in pending):
+            paper_equations = self.dataset.paper_equations(paper_id)
+            for paper_id, eq_id, prior_blocks, current in iter_context_parts(paper_equations, include):
+                if self.prompt_layout == "cached":
+                    yield paper_id, eq_id, construct_cached_prompt(paper_id, eq_id, prior_blocks, current), get_system_prompt()
+                else:
+                    context = render_combined_context(paper_id, eq_id, prior_blocks, current)
+                    yield paper_id, eq_id, construct_final_prompt(context), None
+    
+    def generate_one(self, prompt, system=None):
+        """Send one prompt, waiting for the rate limiter first and retrying transient errors.
+        
+        Cached responses are returned without touching the rate limiter. Returns a
+        Completion with `latency` and `retries` filled in; a request that fails for
+        good raises RequestFailed.
+        """
+        key = request_key(self.config, prompt, system) if self.cache else None
+        text = self.cache.get(key) if self.cache else None
+        if text is not None:
+            return Completion(text, from_cache=True)
+
+        tokens = estimate_tokens(prompt_text(prompt))
+        self.rate_limiter.acquire(tokens)
+        start = time.monotonic()
+        retries = 0
+        while True:
+            try:
+                completion = self.generate_fn(prompt, system=system)
+                break
+            except Exception as e:
+                if retries >= self.config.max_retries or classify_error(e) not in RETRYABLE_ERRORS or self.stop_event.is_set():
+                    raise RequestFailed(e, retries, time.monotonic() - start) from e
+                retries += 1
+                time.sleep(min(2 ** retries, 60) * random.uniform(0.5, 1.0))
+                self.rate_limiter.acquire(tokens)
+        completion.latency = time.monotonic() - start
+        completion.retries = retries
+        if self.cache:
+            self.cache.put(key, completion.text)
+        return completion
     
-    def generate_all(self, fresh=False, paper_ids=None):
-        """Generate all pending equations."""
+    def generate_all(self, fresh=False, paper_ids=None, concurrency=None, prompts=None, keys=None):
+        """Generate all pending equations, up to `concurrency` requests in flight.
+        
+        `prompts` may supply prebuilt (paper_id, eq_id, prompt, system) tuples,
+        e.g. shared between models; those already generated are skipped.
+        `keys` restricts the run to these (paper_id, equation_id) items.
+        """
         if fresh:
             self.results = {}
+            self.save_results()
             print("🆕 Starting fresh generation")
         
-        pending = self.get_pending_equations(paper_ids)
+        if keys is not None:
+            pending = [key for key in keys if key[1] not in self.results.get(key[0], {})]
+        else:
+            pending = self.get_pending_equations(paper_ids)
         if not pending:
             print("✅ All equations already generated!")
             return
         
-        print(f"🔄 Generating {len(pending)} equations...")
+        workers = concurrency or self.config.max_concurrency
+        print(f"🔄 Generating {len(pending)} equations ({workers} parallel requests)...")
         
-        blocks = build_combined_context(pending)
+        if prompts is None:
+            prompts = self.iter_prompts(pending)
+        else:
+            keys = set(pending)
+            prompts = (item for item in prompts if (item[0], item[1]) in keys)
+        prompts = iter(prompts)
+        request_log = RequestLog(self.request_log_path)
+        usage = []
         generated = 0
+        finished = 0
         
-        for paper_id, eq_id, context in blocks:
-            print(f"Processing {paper_id}-{eq_id}...", end=" ")
-            
-            try:
-                prompt = construct_final_prompt(context)
-                latex = self.generate_fn(prompt)
-                
-                # Store result
-                if paper_id not in self.results:
-                    self.results[paper_id] = {}
-                self.results[paper_id][eq_id] = latex.strip()
-                
-                generated += 1
-                print(f"✅ {latex[:50]}{'...' if len(latex) > 50 else ''}")
-                
-                # Save every 5 equations
-                if generated % 5 == 0:
-                    self.save_results()
-                    print(f"💾 Saved progress ({generated} done)")
-                
-                time.sleep(0.5)  # Rate limiting
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            while True:
+                # Keep the pool busy without building every prompt up front
+                for paper_id, eq_id, prompt, system in prompts:
+                    future = pool.submit(self.generate_one, prompt, system)
+                    in_flight[future] = (paper_id, eq_id)
+                    if len(in_flight) >= workers * 2 or self.stop_event.is_set():
+                        break
+                if self.stop_event.is_set():
+                    # Drain requests already running; drop the ones still queued
+                    prompts = iter(())
+                    for future in in_flight:
+                        future.cancel()
+                if not in_flight:
+                    break
                 
-            except Exception as e:
-                print(f"❌ Error: {e}")
+                try:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    for future in in_flight:
+                        future.cancel()
+                    raise
+                for future in done:
+                    paper_id, eq_id = in_flight.pop(future)
+                    finished += 1
+                    label = f"[{finished}/{len(pending)}] {self.llm_name} {paper_id}-{eq_id}:"
+                    if future.cancelled():
+                        continue
+                    
+                    base = {
+                        "paper_id": paper_id,
+                        "equation_id": eq_id,
+                        "model": self.config.model,
+                        "layout": self.prompt_layout,
+                    }
+                    try:
+                        completion = future.result()
+                    except RequestFailed as e:
+                        record = {**base, "error_class": e.error_class, "error": str(e),
+                                  "retries": e.retries, "latency": e.latency}
+                        usage.append(request_log.record(**record))
+                        print(f"{label} ❌ {e.error_class} after {e.retries} retries: {e}")
+                        continue
+                    
+                    record = {
+                        **base,
+                        "from_cache": completion.from_cache,
+                        "input_tokens": completion.input_tokens,
+                        "cached_input_tokens": completion.cached_input_tokens,
+                        "output_tokens": completion.output_tokens,
+                        "time_to_first_token": completion.time_to_first_token,
+                        "stopped_early": completion.stopped_early,
+                        "latency": completion.latency,
+                        "retries": completion.retries,
+                        "error_class": None,
+                    }
+                    usage.append(request_log.record(**record))
+                    
+                    latex = completion.text
+                    self.record_result(paper_id, eq_id, latex)
+                    generated += 1
+                    print(f"{label} ✅ {latex[:50]}{'...' if len(latex) > 50 else ''}")
         
+        request_log.close()
         self.save_results()
-        print(f"✅ Generated {generated} equations!")
+        print(f"✅ {self.llm_name}: generated {generated} equations!")
         self.print_stats()
+        summarize_usage(usage)
+        summarize_latency(usage)
+        if self.cache and self.cache.hits:
+            print(f"🗄️  {self.cache.hits} responses served from cache")
+    
+    def run_batch(self, fresh=False, paper_ids=None, wait=True, poll_interval=60, batch_client=None):
+        """Generate pending equations through the provider's batch API.
+        
+        The submitted batch is recorded in `{llm}_batch.json`, so an interrupted
+        run resumes polling the same batch instead of submitting a new one.
+        """
+        batch_client = batch_client or create_batch_client(self.config, self.api_key)
+        state = self.load_batch_state()
+        
+        if fresh:
+            self.results = {}
+            self.save_results()
+            state = None
+            print("🆕 Starting fresh generation")
+        
+        if state is None:
+            pending = self.get_pending_equations(paper_ids)
+            if not pending:
+                print("✅ All equations already generated!")
+                return
+            
+            requests = []
+            keys = {}
+            system = None
+            for i, (paper_id, eq_id, prompt, system) in enumerate(self.iter_prompts(pending)):
+                key = request_key(self.config, prompt, system)
+                cached = self.cache.get(key) if self.cache else None
+                if cached is not None:
+                    self.record_result(paper_id, eq_id, cached)
+                    continue
+                # Provider custom_ids only allow [A-Za-z0-9_-], so map them back via the state file
+                custom_id = f"eq-{i:05d}"
+                requests.append((custom_id, prompt))
+                keys[custom_id] = [paper_id, eq_id, key]
+            
+            if not requests:
+                self.save_results()
+                print(f"✅ All {len(pending)} pending equations served from cache")
+                return
+            
+            # The system prompt is the same for every request in a layout
+            state = {"batch_id": batch_client.submit(requests, system=system), "requests": keys}
+            self.save_batch_state(state)
+            print(f"📤 Submitted batch {state['batch_id']} with {len(requests)} requests")
+        else:
+            print(f"⏳ Resuming batch {state['batch_id']} ({len(state['requests'])} requests)")
+        
+        while batch_client.status(state['batch_id']) != "ended":
+            if not wait:
+                print("⏳ Batch still running; re-run with --batch to resume polling")
+                return
+            time.sleep(poll_interval)
+        
+        outputs = batch_client.results(state['batch_id'])
+        for custom_id, text in outputs.items():
+            paper_id, eq_id, key = state['requests'][custom_id]
+            self.record_result(paper_id, eq_id, text)
+            if self.cache:
+                self.cache.put(key, text)
+        self.save_results()
+        os.remove(self.batch_state_path)
+        
+        failed = len(state['requests']) - len(outputs)
+        print(f"✅ Merged {len(outputs)} batch results" + (f" ({failed} failed, will be resubmitted next run)" if failed else ""))
+        self.print_stats()
+    
+    def run_worker(self, queue, paper_ids=None, concurrency=None, chunk_size=None):
+        """Work through a shared queue: claim leased chunks, generate them, mark them done.
+        
+        The queue is seeded (idempotently) with the equations missing from the
+        results file, so any worker can start first. A heartbeat renews this
+        worker's leases while a chunk runs. Results go to this worker's journal;
+        run merge_workers() once the queue is drained.
+        """
+        seeded = queue.seed(self.get_pending_equations(paper_ids))
+        if seeded:
+            print(f"🗂️  Queued {seeded} equations")
+        queue.print_stats()
+        workers = concurrency or self.config.max_concurrency
+        chunk_size = chunk_size or workers * 4
+        
+        heartbeat_stop = threading.Event()
+        def heartbeat():
+            while not heartbeat_stop.wait(queue.lease_seconds / 3):
+                queue.renew(self.worker_id)
+        threading.Thread(target=heartbeat, daemon=True).start()
+        
+        try:
+            while not self.stop_event.is_set():
+                keys = queue.claim(self.worker_id, chunk_size)
+                if not keys:
+                    if not queue.counts().get("leased"):
+                        break
+                    # Other workers hold the rest; their leases may still expire
+                    self.stop_event.wait(min(5, queue.lease_seconds / 4))
+                    continue
+                print(f"📥 Worker {self.worker_id} claimed {len(keys)} equations")
+                try:
+                    self.generate_all(concurrency=workers, keys=keys)
+                finally:
+                    # Only mark items done once their results are on disk
+                    self.journal.sync()
+                    done = [key for key in keys if key[1] in self.results.get(key[0], {})]
+                    queue.complete(done)
+                    queue.release(self.worker_id, [key for key in keys if key not in set(done)],
+                                  failed=not self.stop_event.is_set())
+        finally:
+            heartbeat_stop.set()
+        queue.print_stats()
+    
+    def merge_workers(self):
+        """Fold every worker journal (and request log) into the canonical results file."""
+        pattern = self.output_path.replace('_results.json', '_worker-*_journal.jsonl')
+        merged = 0
+        journals = sorted(glob.glob(pattern))
+        for path in journals:
+            journal = ResultJournal(path)
+            merged += journal.replay(self.results)
+            journal.close()
+        # Workers finish out of order; store papers and equations in dataset order
+        ordered = {}
+        for paper_id, eq_id in self.dataset.keys():
+            if eq_id in self.results.get(paper_id, {}):
+                ordered.setdefault(paper_id, {})[eq_id] = self.results[paper_id][eq_id]
+        for paper_id, equations in self.results.items():
+            for eq_id, output in equations.items():
+                ordered.setdefault(paper_id, {}).setdefault(eq_id, output)
+        self.results = ordered
+        self.save_results()
+        
+        for path in journals:
+            request_log = path.replace('_journal.jsonl', '_requests.jsonl')
+            if os.path.exists(request_log):
+                with open(request_log, 'r', encoding='utf-8') as src, open(self.request_log_path, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(request_log)
+            # Safe to drop: its records are in the results file written above
+            os.remove(path)
+        print(f"🔀 Merged {merged} results from {len(journals)} worker journals into {self.output_path}")
+        self.print_stats()
+    
+    def load_batch_state(self):
+        """Load the in-flight batch record, if any."""
+        if os.path.exists(self.batch_state_path):
+            with open(self.batch_state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+    
+    def save_batch_state(self, state):
+        """Record the submitted batch so it can be resumed."""
+        with open(self.batch_state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+    
+    def show_estimate(self, paper_ids=None, concurrency=None, top=5, detailed=True):
+        """Tokenize pending prompts locally and project wall time and cost."""
+        pending = self.get_pending_equations(paper_ids)
+        count = get_token_counter(self.config)
+        per_paper, per_prompt = count_prompt_tokens(self.iter_prompts(pending), count)
+        print_estimate(self.config, per_paper, per_prompt, read_request_log(self.request_log_path),
+                       concurrency or self.config.max_concurrency, top=top, detailed=detailed)
     
     def show_status(self):
         """Show current status and sample results."""
         self.print_stats()
+        if self.cache:
+            self.cache.print_stats()
+        records = read_request_log(self.request_log_path)
+        summarize_usage(records)
+        summarize_latency(records)
+        self.show_estimate(detailed=False)
         
         if self.results:
             print("\n📋 Sample Results:")
@@ -140,4 +454,107 @@ class MathGenerator:
                     print(f"  {paper_id}-{eq_id}: {latex[:100]}{'...' if len(latex) > 100 else ''}")
                     count += 1
                 if count >= 3:
-                    break
\ No newline at end of file
+                    break
+
+class SharedPrompts:
+    """Prompts for several models, built one paper at a time and shared between them.
+    
+    Each model reads its own iterator. The first to reach a paper builds that
+    paper's prompts, and the others reuse them from an LRU of `max_papers`
+    papers. A model that falls further behind rebuilds the paper itself, so
+    memory stays bounded however far apart the models drift.
+    """
+    
+    def __init__(self, generator, max_papers=SHARED_PROMPT_PAPERS):
+        self.generator = generator
+        self.max_papers = max_papers
+        self.papers = OrderedDict()
+        self.building = {}
+        self.lock = threading.Lock()
+        self.built = 0
+        self.reused = 0
+    
+    def paper_prompts(self, paper_id, keys):
+        """Prompts of every `keys` equation of one paper (all pending equations of the run)."""
+        with self.lock:
+            building = self.building.get(paper_id)
+            if building is None and paper_id not in self.papers:
+                building = self.building[paper_id] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            # Another model is building (or has built) this paper
+            if building is not None:
+                building.wait()
+            with self.lock:
+                prompts = self.papers.get(paper_id)
+                if prompts is not None:
+                    self.papers.move_to_end(paper_id)
+                    self.reused += 1
+                    return prompts
+        
+        try:
+            prompts = list(self.generator.iter_prompts(keys))
+            with self.lock:
+                self.built += 1
+                self.papers[paper_id] = prompts
+                while len(self.papers) > self.max_papers:
+                    self.papers.popitem(last=False)
+        finally:
+            if owner:
+                with self.lock:
+                    del self.building[paper_id]
+                building.set()
+        return prompts
+    
+    def iter_prompts(self, pending, run_keys):
+        """Yield (paper_id, eq_id, prompt, system) for `pending`, building papers from `run_keys`."""
+        wanted = set(pending)
+        by_paper = OrderedDict()
+        for key in run_keys:
+            by_paper.setdefault(key[0], []).append(key)
+        for paper_id in dict.fromkeys(paper_id for paper_id, _ in pending):
+            for item in self.paper_prompts(paper_id, by_paper[paper_id]):
+                if (item[0], item[1]) in wanted:
+                    yield item
+
+
+def generate_many(generators, fresh=False, paper_ids=None, concurrency=None):
+    """Run several models at once, building each prompt a single time.
+    
+    All generators must share a prompt layout. Each model keeps its own
+    thread pool, rate limits, journal and output file; wall time is roughly
+    that of the slowest model rather than the sum.
+    """
+    if len({g.prompt_layout for g in generators}) > 1:
+        raise ValueError("All models in a fan-out run must use the same prompt layout; pass --prompt-layout")
+    if fresh:
+        for generator in generators:
+            generator.results = {}
+            generator.save_results()
+        print("🆕 Starting fresh generation")
+    
+    # A prompt does not depend on which model asks, so a paper's prompts are built
+    # for the union of pending equations and read by every generator (see SharedPrompts)
+    pending = {generator: generator.get_pending_equations(paper_ids) for generator in generators}
+    pending_keys = set().union(*pending.values())
+    run_keys = [key for key in generators[0].dataset.keys(paper_ids) if key in pending_keys]
+    shared = SharedPrompts(generators[0])
+    print(f"🧩 Building prompts for {len(run_keys)} equations once per paper, shared by {len(generators)} models")
+    
+    with ThreadPoolExecutor(max_workers=len(generators)) as pool:
+        futures = {pool.submit(g.generate_all, False, paper_ids, concurrency,
+                               shared.iter_prompts(pending[g], run_keys)): g for g in generators}
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            print("\n⏹️  Stopping: waiting for in-flight requests...")
+            for generator in generators:
+                generator.stop_event.set()
+            wait(futures)
+            raise
+    rebuilt = max(0, shared.built - len({paper_id for paper_id, _ in run_keys}))
+    print(f"🧩 Prompts built for {shared.built} paper(s) and reused {shared.reused} times "
+          f"({rebuilt} rebuilt by a model that fell behind)")
@@ -0,0 +1,76 @@
+"""Append-only checkpoint journal for generation results."""
+
+import json
+import os
+
+
+class ResultJournal:
+    """JSONL log with one record per completed equation.
+
+    Every record is flushed to the OS as soon as it is written, so a crashed
+    process loses nothing; fsync (which guards against power loss) is batched
+    every `fsync_every` records. A torn final line from an interrupted write was
+    never acknowledged and is dropped when the journal is reopened.
+    """
+
+    def __init__(self, path, fsync_every=20):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.unsynced = 0
+        self._drop_torn_tail()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _drop_torn_tail(self):
+        """Cut a partial last line left by a crash, so new records start on a fresh line."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def append(self, paper_id, equation_id, output):
+        """Record one completed equation."""
+        record = {"paper_id": paper_id, "equation_id": equation_id, "output": output}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Force buffered records to disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def replay(self, results):
+        """Apply every journaled record to `results` in place; return how many were read."""
+        count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                results.setdefault(record["paper_id"], {})[record["equation_id"]] = record["output"]
+                count += 1
+        return count
+
+    def compact(self, results, output_path):
+        """Write `results` to `output_path` atomically, then empty the journal.
+
+        A crash between the two steps is harmless: replaying the journal over
+        the new results file re-applies records it already contains.
+        """
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+
+        self.file.truncate(0)
+        self.file.seek(0)
+        self.sync()
+
+    def close(self):
+        self.sync()
+        self.file.close()
@@ -1,81 +1,294 @@
 """Unified LLM client for different providers."""
 
+import time
+from dataclasses import dataclass
+
+# Together-hosted reasoning models leak <think> blocks unless told not to
+NO_THINKING_PROMPT = "You are a helpful mathematical assistant. Do **not** output any <think> or </think> tags or any internal reasoning. Only emit the final answer "
+
+# A streamed answer is complete once both of these have been emitted
+CLOSING_TAGS = ("</latex>", "</description>")
+
+
+@dataclass
+class Completion:
+    """Generated text plus the token usage reported by the provider (None if unknown)."""
+    text: str
+    input_tokens: int = None
+    cached_input_tokens: int = None
+    output_tokens: int = None
+    from_cache: bool = False
+    time_to_first_token: float = None
+    stopped_early: bool = False
+    # Filled in by the caller: wall time including retries, and how many retries it took
+    latency: float = None
+    retries: int = 0
+
+
+# Error classes worth retrying; anything else fails the request straight away
+RETRYABLE_ERRORS = ("rate_limit", "timeout", "connection", "server_error")
+
+
+def classify_error(error):
+    """Map a provider SDK exception to a coarse error class for telemetry and retries.
+
+    The SDKs share naming conventions (RateLimitError, APITimeoutError, ...) and
+    most carry an HTTP `status_code`, so no provider package has to be imported.
+    """
+    name = type(error).__name__
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429 or "RateLimit" in name:
+        return "rate_limit"
+    if "Timeout" in name or isinstance(error, TimeoutError):
+        return "timeout"
+    if "Connection" in name or isinstance(error, ConnectionError):
+        return "connection"
+    if (isinstance(status, int) and status >= 500) or name in ("InternalServerError", "ServiceUnavailableError", "OverloadedError"):
+        return "server_error"
+    if status in (401, 403) or "Authentication" in name or "PermissionDenied" in name:
+        return "auth"
+    if status in (400, 404, 413, 422) or "BadRequest" in name or "NotFound" in name:
+        return "bad_request"
+    return "other"
+
+
+class RequestFailed(Exception):
+    """A request that failed for good, carrying what telemetry needs about it."""
+
+    def __init__(self, error, retries, latency):
+        super().__init__(str(error))
+        self.error = error
+        self.error_class = classify_error(error)
+        self.retries = retries
+        self.latency = latency
+
+
+def prompt_text(prompt):
+    """Flatten a prompt given as a list of segments into one string."""
+    return prompt if isinstance(prompt, str) else "".join(prompt)
+
+
+def chat_messages(prompt, system=None):
+    """OpenAI-style message list; the system prompt (if any) always comes first."""
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt_text(prompt)})
+    return messages
+
+
+def anthropic_params(config, prompt, system=None):
+    """Messages API parameters. A segmented prompt becomes one content block per
+    segment with a cache breakpoint after the last stable one, i.e. before the tail."""
+    if isinstance(prompt, str):
+        content = prompt
+    else:
+        content = [{"type": "text", "text": segment} for segment in prompt if segment]
+        if len(content) > 1:
+            content[-2]["cache_control"] = {"type": "ephemeral"}
+    params = {
+        "model": config.model,
+        "max_tokens": config.max_tokens,
+        "temperature": config.temperature,
+        "messages": [{"role": "user", "content": content}],
+    }
+    if system:
+        params["system"] = system
+    return params
+
+
+class TagWatcher:
+    """Tracks streamed text and reports when every closing tag has been seen."""
+
+    def __init__(self, tags=CLOSING_TAGS):
+        self.pending = list(tags)
+        self.text = ""
+
+    def feed(self, delta):
+        """Add a chunk; return True once the answer is complete."""
+        self.text += delta
+        # Only the new chunk plus a tag's length of overlap can contain a new match
+        for tag in list(self.pending):
+            if self.text.find(tag, max(0, len(self.text) - len(delta) - len(tag))) != -1:
+                self.pending.remove(tag)
+        return not self.pending
+
+
+def stream_options(config, include_usage=True):
+    """Extra chat.completions arguments for streaming, if enabled for this model."""
+    if not config.stream:
+        return {}
+    if include_usage:
+        return {"stream": True, "stream_options": {"include_usage": True}}
+    return {"stream": True}
+
+
+def consume_openai_stream(stream, start):
+    """Read an OpenAI-compatible chat stream until both closing tags appear, then cancel it.
+
+    Closing the stream drops the HTTP connection, which stops generation server-side.
+    Usage arrives in the final chunk, so it is unknown when the stream is cut short.
+    """
+    watcher = TagWatcher()
+    completion = Completion("")
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                fill_openai_usage(completion, chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if completion.time_to_first_token is None and (delta.content or getattr(delta, "reasoning_content", None)):
+                completion.time_to_first_token = time.monotonic() - start
+            if delta.content and watcher.feed(delta.content):
+                completion.stopped_early = True
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    completion.text = watcher.text
+    return completion
+
+
+def openai_completion(response, start=None, streamed=False):
+    """Build a Completion from an OpenAI-compatible chat response or stream."""
+    if streamed:
+        return consume_openai_stream(response, start)
+    completion = Completion(response.choices[0].message.content)
+    if response.usage is not None:
+        fill_openai_usage(completion, response.usage)
+    return completion
+
+
+def fill_openai_usage(completion, usage):
+    """Copy token counts from an OpenAI-compatible usage object."""
+    if usage is not None:
+        completion.input_tokens = usage.prompt_tokens
+        completion.output_tokens = usage.completion_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        if details is not None and getattr(details, "cached_tokens", None) is not None:
+            completion.cached_input_tokens = details.cached_tokens
+        elif getattr(usage, "prompt_cache_hit_tokens", None) is not None:
+            # DeepSeek reports its context cache separately
+            completion.cached_input_tokens = usage.prompt_cache_hit_tokens
+
+
+def anthropic_completion(text, usage):
+    """Build a Completion from Anthropic text and usage (cache reads/writes count as input)."""
+    cache_read = usage.cache_read_input_tokens or 0
+    cache_write = usage.cache_creation_input_tokens or 0
+    return Completion(
+        text,
+        input_tokens=usage.input_tokens + cache_read + cache_write,
+        cached_input_tokens=cache_read,
+        output_tokens=usage.output_tokens,
+    )
+
+
 def create_client(config, api_key):
-    """Create appropriate LLM client based on provider."""
-    
+    """Create appropriate LLM client based on provider.
+
+    The returned `generate(prompt, system=None)` accepts a prompt string or a
+    list of segments ordered most-stable first, and returns a Completion.
+    `config.base_url` (None = the provider default) can point any provider at
+    a proxy or at common.mock_server. SDK clients come from the shared
+    registry, so generators for the same provider reuse one connection pool.
+    SDK retries are turned off: MathGenerator.generate_one retries and logs them.
+    """
+    from common.client_registry import get_client
+
     if config.provider == "openai":
-        import openai
-        client = openai.OpenAI(api_key=api_key)
-        
-        def generate(prompt):
+        client = get_client("openai", api_key, config.base_url, max_retries=0)
+
+        def generate(prompt, system=None):
+            start = time.monotonic()
             response = client.chat.completions.create(
                 model=config.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1024,
-                temperature=0.2
+                messages=chat_messages(prompt, system),
+                max_tokens=config.max_tokens,
+                temperature=config.temperature,
+                **stream_options(config)
             )
-            return response.choices[0].message.content
-    
+            return openai_completion(response, start, config.stream)
+
     elif config.provider == "anthropic":
-        import anthropic
-        client = anthropic.Anthropic(api_key=api_key)
-        
-        def generate(prompt):
-            response = client.messages.create(
-                model=config.model,
-                max_tokens=1024,
-                temperature=0.2,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
-    
+        client = get_client("anthropic", api_key, config.base_url, max_retries=0)
+
+        def generate(prompt, system=None):
+            params = anthropic_params(config, prompt, system)
+            if not config.stream:
+                response = client.messages.create(**params)
+                return anthropic_completion(response.content[0].text, response.usage)
+
+            start = time.monotonic()
+            watcher = TagWatcher()
+            first_token = None
+            stopped = False
+            # Leaving the context manager closes the connection, cancelling the rest
+            with client.messages.stream(**params) as stream:
+                for delta in stream.text_stream:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+                    if watcher.feed(delta):
+                        stopped = True
+                        break
+                usage = stream.current_message_snapshot.usage
+            completion = anthropic_completion(watcher.text, usage)
+            if stopped:
+                # The snapshot still holds message_start's output count; the real one never arrived
+                completion.output_tokens = None
+            completion.time_to_first_token = first_token
+            completion.stopped_early = stopped
+            return completion
+
     elif config.provider == "deepseek":
-        import openai
-        client = openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        
-        def generate(prompt):
+        client = get_client("deepseek", api_key, config.base_url, max_retries=0)
+
+        def generate(prompt, system=None):
+            limit = {"max_tokens": config.max_tokens} if config.max_tokens else {}
+            start = time.monotonic()
             response = client.chat.completions.create(
                 model=config.model,
-                messages=[
-                    # {"role": "system", "content": "You are a helpful assistant"},
-                    {"role": "user", "content": prompt}
-                ],
-                # max_tokens=1024,
-                temperature=0.2,
-                stream=False
+                messages=chat_messages(prompt, system),
+                temperature=config.temperature,
+                **stream_options(config),
+                **limit
             )
-            return response.choices[0].message.content
-    
+            return openai_completion(response, start, config.stream)
+
     elif config.provider == "together":
-        from together import Together
-        client = Together()
-        
-        def generate(prompt):
+        client = get_client("together", api_key, config.base_url)
+
+        def generate(prompt, system=None):
+            start = time.monotonic()
             response = client.chat.completions.create(
                 model=config.model,
-                messages=[
-                    {"role":"system", "content":"You are a helpful mathematical assistant. Do **not** output any <think> or </think> tags or any internal reasoning. Only emit the final answer "},
-                    {"role": "user", "content": prompt}],
-                max_tokens=1024,
-                temperature=0.2,
-                
+                messages=chat_messages(prompt, f"{system}\n{NO_THINKING_PROMPT}" if system else NO_THINKING_PROMPT),
+                max_tokens=config.max_tokens,
+                temperature=config.temperature,
+                **stream_options(config, include_usage=False)
             )
-            return response.choices[0].message.content
-    
+            return openai_completion(response, start, config.stream)
+
     elif config.provider == "huggingface":
-        from huggingface_hub import InferenceClient
-        client = InferenceClient(api_key=api_key)
-        
-        def generate(prompt):
+        client = get_client("huggingface", api_key, config.base_url)
+
+        def generate(prompt, system=None):
+            start = time.monotonic()
             response = client.chat.completions.create(
                 model=config.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1024,
-                temperature=0.2
+                messages=chat_messages(prompt, system),
+                max_tokens=config.max_tokens,
+                temperature=config.temperature,
+                **stream_options(config, include_usage=False)
             )
-            return response.choices[0].message.content
-    
+            return openai_completion(response, start, config.stream)
+
+    elif config.provider == "transformers":
+        # Local model: concurrent calls are batched together on one set of weights
+        from local_backend import get_backend
+        generate = get_backend(config).generate
+
     else:
         raise ValueError(f"Unknown provider: {config.provider}")
-    
-    return generate
\ No newline at end of file
+
+    return generate
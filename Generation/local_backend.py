@@ -0,0 +1,180 @@
+"""Local Hugging Face `transformers` backend with dynamic batching and prefix KV reuse.
+
+Concurrent `generate` calls (one per pool worker in MathGenerator) are queued
+and run as padded batches on one model. Prompts of the same paper share a
+long token prefix (instructions, paper header, prior equations); its KV cache
+is computed once, kept in a small LRU and extended by later batches, so only
+each prompt's new tail is prefilled. That prefix needs the "cached" prompt
+layout, the local models' default: the "inline" prompt names the current
+equation before the prior blocks, so only the instructions are shared.
+"""
+
+import copy
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from llm_client import CLOSING_TAGS, Completion, chat_messages
+
+# Wait this long for more requests before running a partial batch
+BATCH_WAIT = 0.05
+# Shared prefixes shorter than this are not worth caching
+MIN_PREFIX_TOKENS = 32
+# Prefix KV caches kept (roughly one per paper in flight)
+PREFIX_CACHE_SIZE = 4
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def common_prefix_length(sequences):
+    """Length of the longest common prefix of several token id lists."""
+    first = sequences[0]
+    length = len(first)
+    for seq in sequences[1:]:
+        length = min(length, len(seq))
+        for i in range(length):
+            if seq[i] != first[i]:
+                length = i
+                break
+    return length
+
+
+class TransformersBackend:
+    """One causal LM serving queued prompts in batches of up to `config.max_concurrency`."""
+
+    def __init__(self, config):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        self.torch = torch
+        self.config = config
+        self.device = config.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.tokenizer = AutoTokenizer.from_pretrained(config.model)
+        self.model = AutoModelForCausalLM.from_pretrained(config.model, torch_dtype="auto").to(self.device)
+        self.model.eval()
+        self.pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        self.max_batch_size = max(1, config.max_concurrency)
+        self.requests = queue.Queue()
+        self.prefixes = OrderedDict()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def encode(self, prompt, system=None):
+        """Token ids of the chat-formatted prompt, ready for generation."""
+        messages = chat_messages(prompt, system)
+        if self.tokenizer.chat_template:
+            return list(self.tokenizer.apply_chat_template(messages, add_generation_prompt=True))
+        return self.tokenizer("\n\n".join(m["content"] for m in messages))["input_ids"]
+
+    def generate(self, prompt, system=None):
+        """Queue one prompt and block until the batch it joins has run."""
+        future = Future()
+        self.requests.put((self.encode(prompt, system), future))
+        return future.result()
+
+    def _serve(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + BATCH_WAIT
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                completions = self._run([ids for ids, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), completion in zip(batch, completions):
+                    future.set_result(completion)
+
+    def _prefix_cache(self, prefix):
+        """KV cache for `prefix`, built by extending the longest cached prefix of it.
+
+        Returns (cache, tokens that were already cached). The cache is shared;
+        callers must copy it before generating on top of it.
+        """
+        from transformers import DynamicCache
+        prefix = tuple(prefix)
+        best = max((key for key in self.prefixes if len(key) <= len(prefix) and prefix[:len(key)] == key),
+                   key=len, default=())
+        if best == prefix:
+            self.prefixes.move_to_end(best)
+            return self.prefixes[best], len(best)
+
+        past = copy.deepcopy(self.prefixes[best]) if best else DynamicCache()
+        input_ids = self.torch.tensor([prefix[len(best):]], device=self.device)
+        with self.torch.no_grad():
+            out = self.model(input_ids=input_ids, past_key_values=past, use_cache=True)
+        self.prefixes[prefix] = out.past_key_values
+        while len(self.prefixes) > PREFIX_CACHE_SIZE:
+            self.prefixes.popitem(last=False)
+        return out.past_key_values, len(best)
+
+    def _run(self, batch_ids):
+        """Generate for a batch of tokenized prompts, reusing the KV cache of their shared prefix."""
+        torch = self.torch
+        # Leave at least one token per prompt to prefill, so generate() has logits to start from
+        prefix_len = min(common_prefix_length(batch_ids), min(map(len, batch_ids)) - 1)
+        past, reused = None, 0
+        if prefix_len >= MIN_PREFIX_TOKENS:
+            shared, reused = self._prefix_cache(batch_ids[0][:prefix_len])
+            past = copy.deepcopy(shared)
+            if len(batch_ids) > 1:
+                past.batch_repeat_interleave(len(batch_ids))
+        else:
+            prefix_len = 0
+
+        # Pad between the shared prefix and each tail so all tails end on the last position;
+        # the attention mask hides the padding and position ids skip over it
+        tails = [ids[prefix_len:] for ids in batch_ids]
+        width = max(map(len, tails))
+        input_ids = torch.tensor(
+            [ids[:prefix_len] + [self.pad_id] * (width - len(tail)) + tail for ids, tail in zip(batch_ids, tails)],
+            device=self.device)
+        attention_mask = torch.tensor(
+            [[1] * prefix_len + [0] * (width - len(tail)) + [1] * len(tail) for tail in tails],
+            device=self.device)
+
+        if self.config.temperature:
+            sampling = {"do_sample": True, "temperature": self.config.temperature}
+        else:
+            sampling = {"do_sample": False}
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                past_key_values=past,
+                max_new_tokens=self.config.max_tokens or 1024,
+                pad_token_id=self.pad_id,
+                # The answer is complete once </description> (the last tag) is out
+                stop_strings=[CLOSING_TAGS[-1]],
+                tokenizer=self.tokenizer,
+                **sampling
+            )
+
+        completions = []
+        for i, ids in enumerate(batch_ids):
+            generated = output[i, input_ids.shape[1]:]
+            completions.append(Completion(
+                self.tokenizer.decode(generated, skip_special_tokens=True),
+                input_tokens=len(ids),
+                # The first prompt paid for extending the prefix; the rest got all of it for free
+                cached_input_tokens=prefix_len if i else reused,
+                output_tokens=int((generated != self.pad_id).sum()),
+            ))
+        return completions
+
+
+def get_backend(config):
+    """Shared backend per (model, device), so the weights are loaded once per process."""
+    key = (config.model, config.device)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = TransformersBackend(config)
+        return _backends[key]
@@ -1,9 +1,14 @@
 """Command-line interface for math generation."""
 
 import argparse
+import os
+import socket
 import sys
-from config import LLMS
-from generator import MathGenerator
+from batch_client import create_batch_client
+from config import LLMS, TRACKED_LLMS
+from common.client_registry import POOLED_PROVIDERS, configure as configure_pool
+from generator import PROMPT_LAYOUTS, MathGenerator, generate_many, load_dataset
+from work_queue import WorkQueue
 
 def main():
     parser = argparse.ArgumentParser(
@@ -11,11 +16,30 @@ def main():
         formatter_class=argparse.RawTextHelpFormatter
     )
     
-    parser.add_argument('--llm', type=str, help='LLM to use for generation (e.g., "gpt-4o")')
+    parser.add_argument('--llm', nargs='+', help='LLM(s) to use for generation (e.g., "gpt-4o-mini"); several names or "all" run them concurrently')
     parser.add_argument('--list', action='store_true', help='List available LLMs')
     parser.add_argument('--fresh', action='store_true', help='Start fresh, ignoring any previous results')
     parser.add_argument('--papers', nargs='+', help='Generate only for specific paper IDs (e.g., --papers "2024.acl-short.1")')
     parser.add_argument('--status', action='store_true', help='Show the current progress and status')
+    parser.add_argument('--estimate', action='store_true', help='Tokenize pending prompts and project wall time and cost, without sending anything')
+    parser.add_argument('--concurrency', type=int, help='Maximum parallel requests (defaults to the per-model limit in config.py)')
+    parser.add_argument('--prompt-layout', choices=PROMPT_LAYOUTS,
+                        help='inline: original single-message prompt; cached: system prompt + stable per-paper prefix first, for provider prompt caching '
+                             '(default: the model\'s prompt_layout, inline except for local models)')
+    parser.add_argument('--stream', action=argparse.BooleanOptionalAction, default=None,
+                        help='Stream responses and cancel each request once </latex> and </description> have been received')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the on-disk response cache')
+    parser.add_argument('--max-connections', type=int, help='Cap on concurrent HTTP connections per provider, shared by all models of that provider '
+                             '(OpenAI, DeepSeek and Anthropic only; default: 32)')
+    parser.add_argument('--base-url', type=str, help='Send requests to this API endpoint instead of the provider default (e.g. a proxy or common/mock_server.py)')
+    parser.add_argument('--batch', action='store_true', help='Submit pending prompts as one batch job (OpenAI/Anthropic), poll and merge; resumes an in-flight batch')
+    parser.add_argument('--no-wait', action='store_true', help='With --batch, submit or check the batch once and exit instead of polling')
+    parser.add_argument('--poll-interval', type=int, default=60, help='Seconds between batch status checks (default: 60)')
+    parser.add_argument('--queue', type=str, help='Run as a worker on this shared SQLite work queue (several processes/machines can share it)')
+    parser.add_argument('--worker-id', type=str, help='Worker name for --queue (default: <hostname>-<pid>)')
+    parser.add_argument('--lease', type=int, default=600, help='Seconds a claimed queue item stays reserved without a heartbeat (default: 600)')
+    parser.add_argument('--merge', action='store_true', help='Merge all worker journals into the results file (run after the queue is drained)')
+    parser.add_argument('--batch-dir', type=str, help='Use a local file-based batch service in this directory instead of the provider API (testing)')
     
     args = parser.parse_args()
     
@@ -31,22 +55,63 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    if args.llm not in LLMS:
-        print(f"❌ Error: Unknown LLM '{args.llm}'")
+    llm_names = TRACKED_LLMS if args.llm == ['all'] else args.llm
+    unknown = [name for name in llm_names if name not in LLMS]
+    if unknown:
+        print(f"❌ Error: Unknown LLM '{unknown[0]}'")
         print("Use --list to see available options.")
         sys.exit(1)
     
-    generator = None
+    generators = []
     exit_code = 0
     try:
-        print(f"🔧 Initializing generator for '{args.llm}'...")
-        generator = MathGenerator(args.llm)
+        if args.max_connections:
+            for provider in {LLMS[name].provider for name in llm_names}:
+                if provider in POOLED_PROVIDERS:
+                    configure_pool(provider, max_connections=args.max_connections)
+                else:
+                    print(f"⚠️  --max-connections does not apply to {provider} models; their SDK manages its own connections")
         
-        if args.status:
-            generator.show_status()
-        else:
+        # Open the dataset once and share it between all selected models
+        dataset = load_dataset()
+        worker_id = None
+        if args.queue and not args.merge:
+            worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        for llm_name in llm_names:
+            print(f"🔧 Initializing generator for '{llm_name}'...")
+            generators.append(MathGenerator(llm_name, use_cache=not args.no_cache, prompt_layout=args.prompt_layout,
+                                            stream=args.stream, dataset=dataset, base_url=args.base_url,
+                                            worker_id=worker_id))
+        
+        for generator in generators:
+            if args.status:
+                generator.show_status()
+            elif args.estimate:
+                generator.show_estimate(paper_ids=args.papers, concurrency=args.concurrency)
+            elif args.merge:
+                if args.queue:
+                    queue = WorkQueue(args.queue, generator.llm_name)
+                    queue.print_stats()
+                    if queue.counts().get("leased"):
+                        print(f"⚠️  Workers still hold leases for '{generator.llm_name}'; merge once they finish")
+                        continue
+                generator.merge_workers()
+            elif args.queue:
+                print(f"👷 Working on queue {args.queue} as '{worker_id}' for '{generator.llm_name}'...")
+                queue = WorkQueue(args.queue, generator.llm_name, lease_seconds=args.lease)
+                generator.run_worker(queue, paper_ids=args.papers, concurrency=args.concurrency)
+            elif args.batch:
+                print(f"📦 Starting batch generation for '{generator.llm_name}'...")
+                batch_client = create_batch_client(generator.config, generator.api_key, local_dir=args.batch_dir)
+                generator.run_batch(fresh=args.fresh, paper_ids=args.papers, wait=not args.no_wait,
+                                    poll_interval=args.poll_interval, batch_client=batch_client)
+        
+        if not (args.status or args.estimate or args.batch or args.queue or args.merge):
             print("🚀 Starting generation...")
-            generator.generate_all(fresh=args.fresh, paper_ids=args.papers)
+            if len(generators) > 1:
+                generate_many(generators, fresh=args.fresh, paper_ids=args.papers, concurrency=args.concurrency)
+            else:
+                generators[0].generate_all(fresh=args.fresh, paper_ids=args.papers, concurrency=args.concurrency)
             
     except KeyboardInterrupt:
         print("\n\n⏹️  Process interrupted by user.")
@@ -55,10 +120,11 @@ def main():
         print(f"\n❌ An unexpected error occurred: {e}")
         exit_code = 1
     finally:
-        if generator and not args.status:
+        if generators and not (args.status or args.estimate or args.merge):
             print("\n💾 Attempting to save final results...")
-            generator.save_results()
-            print(f"✅ Results saved to: {generator.output_path}")
+            for generator in generators:
+                generator.save_results()
+                print(f"✅ Results saved to: {generator.journal_path if generator.worker_id else generator.output_path}")
 
     sys.exit(exit_code)
 
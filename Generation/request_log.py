@@ -0,0 +1,94 @@
+"""Per-request log of generation calls (latency, retries, errors, token usage, cache behaviour)."""
+
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+class RequestLog:
+    """Append-only JSONL file with one record per request sent to the model."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def record(self, **fields):
+        """Append one record, stamped with the current time, and return it."""
+        record = {"time": time.time(), **fields}
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+        return record
+
+    def close(self):
+        self.file.close()
+
+
+def read_request_log(path):
+    """Load every record from a request log (an empty list if it does not exist)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_usage(records):
+    """Print input (cached/uncached) and output token totals for a set of records."""
+    sent = [r for r in records if not r.get("from_cache") and not r.get("error_class")]
+    if not sent:
+        return
+    input_tokens = sum(r.get("input_tokens") or 0 for r in sent)
+    cached = sum(r.get("cached_input_tokens") or 0 for r in sent)
+    output_tokens = sum(r.get("output_tokens") or 0 for r in sent)
+    cached_pct = (cached / input_tokens * 100) if input_tokens else 0
+    print(f"🧮 Tokens over {len(sent)} requests: input {input_tokens:,} "
+          f"({cached:,} cached, {cached_pct:.1f}%; {input_tokens - cached:,} uncached) | output {output_tokens:,}")
+
+    first_token = [r["time_to_first_token"] for r in sent if r.get("time_to_first_token") is not None]
+    if first_token:
+        stopped = sum(1 for r in sent if r.get("stopped_early"))
+        print(f"⏱️  Streamed {len(first_token)} requests: median time-to-first-token "
+              f"{statistics.median(first_token):.2f}s | {stopped} cancelled after the closing tags")
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a non-empty list (pct in 0-100)."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latency(records):
+    """Print p50/p95/p99 latency, requests/min and failures per model.
+
+    Cache hits are left out. Throughput is measured from the start of the
+    first request to the end of the last one, so it is only meaningful for
+    records from a single run.
+    """
+    by_model = defaultdict(list)
+    for record in records:
+        if not record.get("from_cache") and record.get("latency") is not None:
+            by_model[record["model"]].append(record)
+
+    for model, group in by_model.items():
+        ok = [r for r in group if not r.get("error_class")]
+        failed = Counter(r["error_class"] for r in group if r.get("error_class"))
+        retries = sum(r.get("retries") or 0 for r in group)
+        span = max(r["time"] for r in group) - min(r["time"] - r["latency"] for r in group)
+        per_minute = len(group) / span * 60 if span > 0 else 0.0
+
+        line = f"📈 {model}: {len(group)} requests, {per_minute:.1f} req/min, {retries} retries"
+        if ok:
+            latencies = [r["latency"] for r in ok]
+            line += (f" | latency p50 {percentile(latencies, 50):.2f}s, "
+                     f"p95 {percentile(latencies, 95):.2f}s, p99 {percentile(latencies, 99):.2f}s")
+        print(line)
+        if failed:
+            print(f"   ❌ {sum(failed.values())} failed: " + ", ".join(f"{name} {count}" for name, count in failed.most_common()))
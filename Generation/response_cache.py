@@ -0,0 +1,14 @@
+"""Cache keys for generation requests (the cache itself is common/response_cache.py)."""
+
+import hashlib
+import json
+
+
+def request_key(config, prompt, system=None):
+    """Hash everything that determines a response: provider, endpoint, model, prompt and sampling."""
+    # base_url keeps answers from a proxy or the mock server apart from the provider's own
+    fields = [config.provider, config.base_url, config.model, prompt, config.temperature, config.max_tokens]
+    if system:
+        fields.append(system)
+    payload = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
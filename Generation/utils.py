@@ -1,35 +1,64 @@
 from collections import defaultdict
 
-def build_combined_context(data_list):
+def iter_context_parts(data_list, include=None):
+    """
+    Lazily yield (paper_id, equation_id, prior_blocks, current) for each equation.
+
+    Equation n's context is the same as equation n-1's plus one more prior
+    equation, so each paper keeps a growing list of rendered prior equations
+    (context, description, LaTeX) and renders each one only once. `current` is
+    the context of the equation being asked for. Only the current paper's
+    blocks are held in memory.
+
+    If `include` is a set of (paper_id, equation_id), only those equations are
+    yielded, but every equation in `data_list` still counts as a prior one, so a
+    prompt does not depend on which other equations are still pending.
+    """
     papers = defaultdict(list)
     for entry in data_list:
         papers[entry["paper_id"]].append(entry)
 
-    blocks = []
     for paper_id, eq_list in papers.items():
+        if include is not None and not any((paper_id, eq["equation_id"]) in include for eq in eq_list):
+            continue
+
         # sort by numeric eq id if you can
         try:
             eq_list.sort(key=lambda x: int(x["equation_id"]))
         except:
             eq_list.sort(key=lambda x: x["equation_id"])
-        for i, eq in enumerate(eq_list):
+
+        prior_blocks = []
+        for eq in eq_list:
             eq_id = eq["equation_id"]
-            lines = [f"Combined context for paper {paper_id}, Equation {eq_id}", ""]
-            for j in range(i+1):
-                e = eq_list[j]
-                lines.append(f"Context for Equation {e['equation_id']}:")
-                lines.append(e["context"])
-                # Only include description for prior equations (not current)
-                if j < i and e.get("description"):
-                    lines.append("Description:")
-                    lines.append(e["description"])
-                # only show prior LaTeX
-                if j < i:
-                    for tex in e.get("EQ_latex", []):
-                        lines.append(f"<latex>{tex}</latex>")
-                lines.append("")  # blank
-            blocks.append((paper_id, eq_id, "\n".join(lines)))
-    return blocks
+            current = f"Context for Equation {eq_id}:\n{eq['context']}\n"
+            if include is None or (paper_id, eq_id) in include:
+                yield paper_id, eq_id, tuple(prior_blocks), current
+
+            # Once answered, this equation joins the prefix with its description and LaTeX
+            prior = [current]
+            if eq.get("description"):
+                prior.append(f"Description:\n{eq['description']}\n")
+            for tex in eq.get("EQ_latex", []):
+                prior.append(f"<latex>{tex}</latex>\n")
+            prior.append("\n")
+            prior_blocks.append("".join(prior))
+
+
+def render_combined_context(paper_id, eq_id, prior_blocks, current):
+    """Join the parts from iter_context_parts into one combined-context string."""
+    return f"Combined context for paper {paper_id}, Equation {eq_id}\n\n{''.join(prior_blocks)}{current}"
+
+
+def iter_combined_context(data_list):
+    """Lazily yield (paper_id, equation_id, combined_context) for each equation."""
+    for paper_id, eq_id, prior_blocks, current in iter_context_parts(data_list):
+        yield paper_id, eq_id, render_combined_context(paper_id, eq_id, prior_blocks, current)
+
+
+def build_combined_context(data_list):
+    """Materialize every combined-context block; prefer iter_combined_context for long runs."""
+    return list(iter_combined_context(data_list))
 
 
 def get_system_prompt():
@@ -73,4 +102,19 @@ def construct_final_prompt(combined_context):
     wrap one sentence variable description in <description>...</description>. Do not include any explanation or extra commentary.
     {combined_context}
     """
-    return prompt
\ No newline at end of file
+    return prompt
+
+def construct_cached_prompt(paper_id, eq_id, prior_blocks, current):
+    """
+    Construct the prompt as segments ordered most-stable first, for provider prompt caching.
+
+    The instructions go in the system prompt (see get_system_prompt). The user
+    message starts with the paper header and the prior equations, which the
+    next equation of the same paper repeats verbatim, and ends with the only
+    part unique to this request: the current context and which equation to write.
+    """
+    return [
+        f"Combined context for paper {paper_id}\n\n",
+        *prior_blocks,
+        f"{current}\nGenerate Equation {eq_id}.",
+    ]
@@ -0,0 +1,134 @@
+"""Shared work queue for splitting one model's generation across processes and machines."""
+
+import sqlite3
+import threading
+import time
+
+# Items that fail this many times are parked as "failed" instead of being handed out again
+MAX_ATTEMPTS = 3
+
+
+class WorkQueue:
+    """SQLite table of (paper_id, equation_id) items that workers claim under expiring leases.
+
+    A claimed item is invisible to other workers until its lease expires, so a
+    worker that dies simply lets its items be claimed again (each expiry counts as
+    a failed attempt). Workers never write
+    the results file; each appends to its own journal and `--merge` combines them.
+    One file can hold queues for several models (`name` is usually the LLM name).
+    The file must live on a filesystem with working POSIX locks.
+    """
+
+    def __init__(self, path, name, lease_seconds=600):
+        self.path = path
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "queue TEXT NOT NULL, paper_id TEXT NOT NULL, equation_id TEXT NOT NULL, position INTEGER NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (queue, paper_id, equation_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS items_claim ON items (queue, status, position)")
+
+    def _transaction(self, work):
+        """Run `work()` inside an immediate (write-locked) transaction."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def seed(self, keys):
+        """Add (paper_id, equation_id) items in order; items already queued are left alone."""
+        def work():
+            start = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM items WHERE queue = ?",
+                                      (self.name,)).fetchone()[0]
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO items (queue, paper_id, equation_id, position) VALUES (?, ?, ?, ?)",
+                [(self.name, paper_id, eq_id, start + i) for i, (paper_id, eq_id) in enumerate(keys)],
+            )
+            return self.conn.total_changes - before
+        return self._transaction(work)
+
+    def claim(self, worker, limit):
+        """Lease up to `limit` pending items in dataset order.
+
+        Expired leases are handed back first and count as a failed attempt, since
+        their worker died holding them (an item that crashes every worker it
+        reaches is parked as failed after MAX_ATTEMPTS, like any other failure).
+        """
+        def work():
+            now = time.time()
+            self.conn.execute(
+                "UPDATE items SET status = 'pending', worker = NULL, lease_expires = NULL, attempts = attempts + 1 "
+                "WHERE queue = ? AND status = 'leased' AND lease_expires < ?",
+                (self.name, now),
+            )
+            rows = self.conn.execute(
+                "SELECT paper_id, equation_id FROM items WHERE queue = ? AND attempts < ? AND status = 'pending' "
+                "ORDER BY position LIMIT ?",
+                (self.name, MAX_ATTEMPTS, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE items SET status = 'leased', worker = ?, lease_expires = ? "
+                "WHERE queue = ? AND paper_id = ? AND equation_id = ?",
+                [(worker, now + self.lease_seconds, self.name, paper_id, eq_id) for paper_id, eq_id in rows],
+            )
+            return [tuple(row) for row in rows]
+        return self._transaction(work)
+
+    def renew(self, worker):
+        """Extend every lease this worker holds (heartbeat)."""
+        self._transaction(lambda: self.conn.execute(
+            "UPDATE items SET lease_expires = ? WHERE queue = ? AND status = 'leased' AND worker = ?",
+            (time.time() + self.lease_seconds, self.name, worker),
+        ))
+
+    def complete(self, keys):
+        """Mark items done (their results are durable in a worker journal)."""
+        self._transaction(lambda: self.conn.executemany(
+            "UPDATE items SET status = 'done', worker = NULL, lease_expires = NULL "
+            "WHERE queue = ? AND paper_id = ? AND equation_id = ?",
+            [(self.name, paper_id, eq_id) for paper_id, eq_id in keys],
+        ))
+
+    def release(self, worker, keys, failed=True):
+        """Hand leased items back to the queue; `failed` counts it as an attempt."""
+        def work():
+            self.conn.executemany(
+                "UPDATE items SET status = 'pending', worker = NULL, lease_expires = NULL, attempts = attempts + ? "
+                "WHERE queue = ? AND paper_id = ? AND equation_id = ? AND status = 'leased' AND worker = ?",
+                [(int(failed), self.name, paper_id, eq_id, worker) for paper_id, eq_id in keys],
+            )
+        self._transaction(work)
+
+    def counts(self):
+        """Item counts by state: pending, leased (live leases), expired, done and failed."""
+        now = time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT CASE "
+                "WHEN status = 'done' THEN 'done' "
+                "WHEN attempts >= ? THEN 'failed' "
+                "WHEN status = 'leased' AND lease_expires >= ? THEN 'leased' "
+                "WHEN status = 'leased' THEN 'expired' "
+                "ELSE 'pending' END AS state, COUNT(*) FROM items WHERE queue = ? GROUP BY state",
+                (MAX_ATTEMPTS, now, self.name),
+            ).fetchall()
+        return dict(rows)
+
+    def print_stats(self):
+        counts = self.counts()
+        print(f"🗂️  Queue '{self.name}': " + " | ".join(
+            f"{state}: {counts.get(state, 0)}" for state in ("pending", "leased", "expired", "done", "failed")))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1 @@
+"""Code shared by the Generation and Evaluation pipelines."""
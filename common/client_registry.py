@@ -0,0 +1,97 @@
+"""Process-wide registry of API clients sharing pooled keep-alive HTTP connections.
+
+Every OpenAI-compatible (OpenAI, DeepSeek) and Anthropic client for a provider
+is built on one httpx connection pool, so generators, judges and retries reuse
+warm TLS connections instead of opening new ones, and the pool size doubles as
+a hard cap on concurrent connections to that provider. The Together and
+Hugging Face SDKs manage their own HTTP sessions and cannot take the pool, so
+their clients are only reused, not capped. Clients are cached by
+(provider, api_key, base_url, max_retries); the SDKs are imported on first use.
+"""
+
+import threading
+
+# Providers whose clients are built on the shared pool
+POOLED_PROVIDERS = ("openai", "deepseek", "anthropic")
+# Concurrent connections per provider when not configured otherwise
+DEFAULT_MAX_CONNECTIONS = 32
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_EXPIRY = 30.0
+
+_lock = threading.Lock()
+_limits = {}
+_pools = {}
+_clients = {}
+
+
+def configure(provider, max_connections=None, max_keepalive=None):
+    """Set the connection cap (and idle pool size) for a provider.
+
+    Must be called before the provider's first client is created; raises
+    ValueError afterwards rather than silently keeping the old limits, and
+    for providers outside POOLED_PROVIDERS, whose connections it cannot cap.
+    """
+    if provider not in POOLED_PROVIDERS:
+        raise ValueError(f"'{provider}' clients do not use the shared connection pool")
+    with _lock:
+        if provider in _pools:
+            raise ValueError(f"Connection pool for '{provider}' already exists; configure it before first use")
+        max_connections = max_connections or DEFAULT_MAX_CONNECTIONS
+        _limits[provider] = (max_connections, min(max_keepalive or max_connections, max_connections))
+
+
+def http_pool(provider):
+    """The shared httpx client (connection pool) for a provider."""
+    with _lock:
+        if provider not in _pools:
+            import httpx
+            max_connections, max_keepalive = _limits.get(provider, (DEFAULT_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS))
+            _pools[provider] = httpx.Client(limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ))
+        return _pools[provider]
+
+
+def _build(provider, api_key, base_url, max_retries):
+    # None keeps the SDK's own retry count
+    retry_options = {} if max_retries is None else {"max_retries": max_retries}
+    if provider in ("openai", "deepseek"):
+        import openai
+        return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_pool(provider), **retry_options)
+    if provider == "anthropic":
+        import anthropic
+        return anthropic.Anthropic(api_key=api_key, base_url=base_url, http_client=http_pool(provider), **retry_options)
+    if provider == "together":
+        # The Together SDK manages its own sessions; the instance is still reused
+        from together import Together
+        return Together(base_url=base_url)
+    if provider == "huggingface":
+        from huggingface_hub import InferenceClient
+        return InferenceClient(api_key=api_key, base_url=base_url)
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def get_client(provider, api_key=None, base_url=None, max_retries=None):
+    """Shared SDK client for a provider, created on first request.
+
+    Callers with their own retry loop pass `max_retries=0` so the OpenAI and
+    Anthropic SDKs do not retry underneath it (their default is 2 retries).
+    """
+    key = (provider, api_key, base_url, max_retries)
+    client = _clients.get(key)
+    if client is None:
+        client = _build(provider, api_key, base_url, max_retries)
+        with _lock:
+            client = _clients.setdefault(key, client)
+    return client
+
+
+def close_all():
+    """Close every pooled connection (clients are rebuilt on next use)."""
+    with _lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _clients.clear()
@@ -0,0 +1,113 @@
+"""Compiled SQLite index of the equation dataset with lazy per-paper access."""
+
+import json
+import os
+import sqlite3
+
+
+class DatasetIndex:
+    """Read-only view of the dataset JSON, compiled once into a SQLite file.
+
+    Lookups by (paper_id, equation_id) hit the primary key, and context text is
+    only read for the papers that are asked for, so callers never hold the
+    whole dataset in memory. The index sits next to the JSON and is rebuilt
+    automatically when the JSON changes (size or modification time).
+    """
+
+    def __init__(self, json_path, index_path=None):
+        self.json_path = json_path
+        self.index_path = index_path or os.path.splitext(json_path)[0] + ".index.sqlite"
+        if not self._is_current():
+            self._build()
+        self.conn = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _source_stamp(self):
+        stat = os.stat(self.json_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _is_current(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True) as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        except sqlite3.DatabaseError:
+            return False
+        return row is not None and row[0] == self._source_stamp()
+
+    def _build(self):
+        """Compile the JSON into a fresh index file, then swap it in atomically."""
+        with open(self.json_path, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        with conn:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE papers (paper_id TEXT PRIMARY KEY, position INTEGER NOT NULL, title TEXT)")
+            conn.execute(
+                "CREATE TABLE equations ("
+                "paper_id TEXT NOT NULL, equation_id TEXT NOT NULL, position INTEGER NOT NULL, "
+                "context TEXT, description TEXT, eq_latex TEXT, "
+                "PRIMARY KEY (paper_id, equation_id)) WITHOUT ROWID"
+            )
+            position = 0
+            for paper_position, paper in enumerate(dataset):
+                conn.execute("INSERT INTO papers VALUES (?, ?, ?)", (paper['id'], paper_position, paper.get('title')))
+                for eq in paper['equations']:
+                    conn.execute(
+                        "INSERT INTO equations VALUES (?, ?, ?, ?, ?, ?)",
+                        (paper['id'], eq['equation id'], position, eq['context'],
+                         eq.get('description', ''), json.dumps(eq.get('EQ_latex', []), ensure_ascii=False)),
+                    )
+                    position += 1
+            conn.execute("CREATE INDEX equations_position ON equations (position)")
+            conn.execute("INSERT INTO meta VALUES ('source', ?)", (self._source_stamp(),))
+        conn.close()
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _entry(row):
+        paper_id, equation_id, context, description, eq_latex = row
+        return {
+            'paper_id': paper_id,
+            'equation_id': equation_id,
+            'context': context,
+            'description': description,
+            'EQ_latex': json.loads(eq_latex),
+        }
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM equations").fetchone()[0]
+
+    def paper_ids(self):
+        """All paper ids in dataset order."""
+        return [row[0] for row in self.conn.execute("SELECT paper_id FROM papers ORDER BY position")]
+
+    def keys(self, paper_ids=None):
+        """(paper_id, equation_id) pairs in dataset order, optionally for some papers only."""
+        rows = self.conn.execute("SELECT paper_id, equation_id FROM equations ORDER BY position")
+        if paper_ids:
+            wanted = set(paper_ids)
+            return [tuple(row) for row in rows if row[0] in wanted]
+        return [tuple(row) for row in rows]
+
+    def get(self, paper_id, equation_id):
+        """One equation entry, or None if it is not in the dataset."""
+        row = self.conn.execute(
+            "SELECT paper_id, equation_id, context, description, eq_latex FROM equations "
+            "WHERE paper_id = ? AND equation_id = ?",
+            (paper_id, equation_id),
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def paper_equations(self, paper_id):
+        """Every equation entry of one paper, in dataset order."""
+        rows = self.conn.execute(
+            "SELECT paper_id, equation_id, context, description, eq_latex FROM equations "
+            "WHERE paper_id = ? ORDER BY position",
+            (paper_id,),
+        )
+        return [self._entry(row) for row in rows]
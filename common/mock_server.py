@@ -0,0 +1,271 @@
+"""Local stand-in for the OpenAI, Together and Anthropic chat APIs, for offline load tests.
+
+    python -m common.mock_server --port 8765 --latency lognormal:0.8,0.5 --rate-limit 0.05
+
+OpenAI-compatible clients (OpenAI, Together, DeepSeek) use base_url
+http://127.0.0.1:8765/v1 and Anthropic uses http://127.0.0.1:8765. Any API key
+is accepted. Generation prompts get a canned <latex>/<description> answer and
+judge prompts a canned "Score: ..." (or combined JSON, or single-digit) answer;
+streaming is supported for both APIs, and OpenAI `logprobs` requests get a
+made-up distribution around each answer token.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENERATION_RESPONSE = ("<latex>E = m c^{2}</latex>\n"
+                       "<description>E is the energy, m the mass and c the speed of light.</description>")
+JUDGE_RESPONSE = "Score: 4\nExplanation: The generated equation matches the reference up to notation."
+LOGPROB_JUDGE_RESPONSE = "4"
+COMBINED_JUDGE_RESPONSE = json.dumps({
+    dimension: {"score": 4, "explanation": "Matches the reference up to notation."}
+    for dimension in ("semantic", "reasoning", "completeness", "syntactic", "contextual")
+})
+
+
+def parse_latency(spec):
+    """Build a sampler from "fixed:S", "uniform:LOW,HIGH" or "lognormal:MEDIAN,SIGMA" (seconds)."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values)
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+    raise ValueError(f"Bad latency spec '{spec}'; use fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+
+
+def canned_response(prompt):
+    """Judge prompts ask for a score (or a JSON object of scores, or a single digit); anything else is a generation prompt."""
+    if "JSON object" in prompt:
+        return COMBINED_JUDGE_RESPONSE
+    if "single digit" in prompt:
+        return LOGPROB_JUDGE_RESPONSE
+    return JUDGE_RESPONSE if "Score:" in prompt else GENERATION_RESPONSE
+
+
+def mock_logprobs(tokens, top_n):
+    """OpenAI-style logprobs for answer tokens; a 1-5 digit gets its neighbours as alternatives."""
+    content = []
+    for token in tokens:
+        alternatives = [(token, 0.8)]
+        if token.isdigit() and 1 <= int(token) <= 5:
+            alternatives += [(str(d), p) for d, p in ((int(token) - 1, 0.15), (int(token) + 1, 0.05)) if 1 <= d <= 5]
+        top = [{"token": t, "logprob": math.log(p), "bytes": list(t.encode("utf-8"))} for t, p in alternatives]
+        content.append({**top[0], "top_logprobs": top[:top_n]})
+    return {"content": content}
+
+
+def message_text(content):
+    """Text of a chat message whose content is a string or a list of content blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content or [])
+
+
+class MockLLMServer:
+    """Threaded HTTP server answering chat requests after a sampled delay.
+
+    `latency` samples the time to the first token, `tokens_per_sec` paces the
+    rest of the answer, and a `rate_limit` fraction of requests is rejected
+    with 429. `responder(prompt)` overrides the canned answers.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency="fixed:0", tokens_per_sec=0,
+                 rate_limit=0.0, responder=None):
+        self.sample_latency = parse_latency(latency)
+        self.tokens_per_sec = tokens_per_sec
+        self.rate_limit = rate_limit
+        self.responder = responder or canned_response
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread; returns self so it can be chained."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self):
+        """Count a request and decide whether to reject it with 429."""
+        limited = random.random() < self.rate_limit
+        with self.lock:
+            self.requests += 1
+            self.rate_limited += limited
+        return limited
+
+    def _chunks(self, text):
+        """Split an answer into ~4-character deltas (roughly one token each) with their pacing."""
+        delay = 1 / self.tokens_per_sec if self.tokens_per_sec else 0
+        return [(text[i:i + 4], delay) for i in range(0, len(text), 4)]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                path = self.path.split("?")[0].rstrip("/")
+                if path.endswith("/chat/completions"):
+                    api = "openai"
+                elif path.endswith("/messages"):
+                    api = "anthropic"
+                else:
+                    return self._json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+
+                if server._count():
+                    error = {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}
+                    payload = {"error": error} if api == "openai" else {"type": "error", "error": error}
+                    return self._json(429, payload, {"Retry-After": "1"})
+
+                if api == "openai":
+                    prompt = "".join(message_text(m.get("content")) for m in body.get("messages", []))
+                else:
+                    system = body.get("system") or ""
+                    prompt = message_text(system) + "".join(message_text(m.get("content")) for m in body.get("messages", []))
+                text = server.responder(prompt)
+                usage = (max(1, len(prompt) // 4), max(1, len(text) // 4))
+
+                time.sleep(server.sample_latency())
+                try:
+                    if api == "openai":
+                        self._openai(body, text, usage)
+                    else:
+                        self._anthropic(body, text, usage)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled a stream early
+                    self.close_connection = True
+
+            def _json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+            def _event(self, data, event=None):
+                prefix = f"event: {event}\n" if event else ""
+                self.wfile.write(f"{prefix}data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def _openai(self, body, text, usage):
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                usage_obj = {"prompt_tokens": usage[0], "completion_tokens": usage[1],
+                             "total_tokens": sum(usage), "prompt_tokens_details": {"cached_tokens": 0}}
+                base = {"id": completion_id, "created": int(time.time()), "model": body.get("model")}
+                if not body.get("stream"):
+                    choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                    if body.get("logprobs"):
+                        choice["logprobs"] = mock_logprobs([delta for delta, _ in server._chunks(text)],
+                                                           body.get("top_logprobs") or 0)
+                    return self._json(200, {
+                        **base, "object": "chat.completion",
+                        "choices": [choice],
+                        "usage": usage_obj,
+                    })
+
+                self._start_stream()
+                chunk = {**base, "object": "chat.completion.chunk"}
+                for delta, delay in server._chunks(text):
+                    time.sleep(delay)
+                    self._event(json.dumps({**chunk, "choices": [
+                        {"index": 0, "delta": {"content": delta}, "finish_reason": None}]}))
+                self._event(json.dumps({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self._event(json.dumps({**chunk, "choices": [], "usage": usage_obj}))
+                self._event("[DONE]")
+
+            def _anthropic(self, body, text, usage):
+                message = {
+                    "id": f"msg_{uuid.uuid4().hex[:12]}", "type": "message", "role": "assistant",
+                    "model": body.get("model"), "stop_reason": "end_turn", "stop_sequence": None,
+                    "content": [{"type": "text", "text": text}],
+                    "usage": {"input_tokens": usage[0], "output_tokens": usage[1],
+                              "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0},
+                }
+                if not body.get("stream"):
+                    return self._json(200, message)
+
+                self._start_stream()
+                start = {**message, "content": [], "stop_reason": None,
+                         "usage": {**message["usage"], "output_tokens": 0}}
+                self._event(json.dumps({"type": "message_start", "message": start}), "message_start")
+                self._event(json.dumps({"type": "content_block_start", "index": 0,
+                                        "content_block": {"type": "text", "text": ""}}), "content_block_start")
+                for delta, delay in server._chunks(text):
+                    time.sleep(delay)
+                    self._event(json.dumps({"type": "content_block_delta", "index": 0,
+                                            "delta": {"type": "text_delta", "text": delta}}), "content_block_delta")
+                self._event(json.dumps({"type": "content_block_stop", "index": 0}), "content_block_stop")
+                self._event(json.dumps({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                        "usage": {"output_tokens": usage[1]}}), "message_delta")
+                self._event(json.dumps({"type": "message_stop"}), "message_stop")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Together/Anthropic chat server for load tests")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default="lognormal:0.8,0.5",
+                        help='Time to first token: fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--tokens-per-sec', type=float, default=0, help='Pace streamed answers (0 = no delay)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Fraction of requests rejected with 429')
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.tokens_per_sec, args.rate_limit)
+    print(f"🧪 Mock LLM server on {server.url} (OpenAI base_url {server.url}/v1)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {server.requests} requests, {server.rate_limited} rate-limited")
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
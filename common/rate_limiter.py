@@ -0,0 +1,57 @@
+"""Token-bucket rate limiting for LLM requests."""
+
+import threading
+import time
+
+
+def estimate_tokens(text):
+    """Rough token count for a prompt (about 4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` tokens/min."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.available = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take `amount` tokens and return how long to wait before using them.
+
+        The balance may go negative, so concurrent callers queue up fairly
+        instead of all retrying at the same instant.
+        """
+        with self.lock:
+            self._refill()
+            self.available -= min(amount, self.capacity)
+            if self.available >= 0:
+                return 0.0
+            return -self.available / self.rate
+
+
+class RateLimiter:
+    """Combined requests/min and tokens/min limiter; a limit of 0/None disables it."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        """Block until one request of roughly `tokens` tokens may be sent."""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
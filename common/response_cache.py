@@ -0,0 +1,98 @@
+"""Persistent content-addressed cache of LLM responses, shared by generation and the LLM judge."""
+
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """SQLite store of responses with least-recently-used eviction above `max_bytes`.
+
+    Hit/miss counters are kept both for this process and, persistently, across runs.
+    The total size is summed once at open and then tracked in memory, so an
+    insert does not scan the table.
+    """
+
+    def __init__(self, path, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _bump(self, name, amount=1):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get(self, key):
+        """Return the cached response for `key`, or None."""
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._bump("misses")
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            self._bump("hits")
+            return row[0]
+
+    def put(self, key, response):
+        """Store a response, evicting the least recently used entries if over budget."""
+        size = len(response.encode('utf-8'))
+        with self.lock, self.conn:
+            replaced = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            self.bytes += size - (replaced[0] if replaced else 0)
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Free down to 90% of the budget so eviction does not run on every insert
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if self.bytes <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.bytes -= size
+            evicted += 1
+        self._bump("evictions", evicted)
+
+    def stats(self):
+        """Entry count, size and lifetime hit/miss/eviction counters."""
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            counters = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+    def print_stats(self):
+        """Print lifetime cache statistics."""
+        stats = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = (stats["hits"] / lookups * 100) if lookups else 0
+        print(f"🗄️  Cache: {stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB) | "
+              f"Hits: {stats['hits']}/{lookups} ({hit_rate:.1f}%) | Evictions: {stats['evictions']}")
+